@@ -0,0 +1,184 @@
+"""
+Szybki interfejs wiersza poleceń – raporty i konserwacja bez Qt i modeli ML.
+
+    python -m adhd tasks [--all] [--date YYYY-MM-DD] [--limit N]
+    python -m adhd add-mood Dobry [--energy 7] [--focus 6] [--notes "..."]
+    python -m adhd report [--days 7]
+    python -m adhd check [--quick]
+    python -m adhd vacuum
+    python -m adhd sync ścieżka/do/drugiej.db
+    python -m adhd size
+    python -m adhd retention
+
+Importowany jest wyłącznie `data.database`; nic z `ui` ani `ai`.
+"""
+import os
+import time
+import argparse
+
+from data.database import DatabaseManager, MigrationError
+
+DEFAULT_DB = "data/adhd_app.db"
+
+
+def cmd_tasks(db, args):
+    if args.date:
+        tasks = db.get_task_by_date(args.date)
+    elif args.all:
+        tasks = db.get_tasks()
+    else:
+        tasks = db.get_task_titles(limit=args.limit)
+        for t in tasks:
+            print(f"{t['id']:>5}  {t['title']}")
+        return 0
+
+    for t in tasks[:args.limit]:
+        print(f"{t['id']:>5}  {t['title']:<40} {t['priority']:<7} {t['status']:<12} {t['due_date']}")
+    return 0
+
+
+def cmd_add_mood(db, args):
+    try:
+        db.add_mood(args.date, args.mood, args.notes, args.energy, args.focus)
+    except ValueError as e:
+        print(e)
+        return 1
+    print(f"Zapisano nastrój '{args.mood}' ({args.date}).")
+    return 0
+
+
+def cmd_report(db, args):
+    end = time.time()
+    start = end - args.days * 86400
+    summary = db.get_session_summary(start, end)
+    if not summary:
+        print(f"Brak sesji Pomodoro w ostatnich {args.days} dniach.")
+    else:
+        print(f"{'Dzień':<12} {'Sesje':>6} {'Ukończone':>10} {'Minuty':>7}")
+        for row in summary:
+            print(f"{row['day']:<12} {row['sessions']:>6} {row['completed']:>10} {row['minutes']:>7}")
+        print(f"{'Razem':<12} {sum(r['sessions'] for r in summary):>6} "
+              f"{sum(r['completed'] for r in summary):>10} {sum(r['minutes'] for r in summary):>7}")
+
+    moods = db.get_mood_summary(start, end)
+    if moods:
+        print(f"\n{'Dzień':<12} {'Wpisy':>6} {'Energia':>8} {'Skupienie':>10}")
+        for row in moods:
+            print(f"{row['day']:<12} {row['entries']:>6} {row['energy_level']:>8} {row['focus_level']:>10}")
+    return 0
+
+
+def cmd_check(db, args):
+    messages = db.integrity_check(quick=args.quick)
+    for message in messages:
+        print(message)
+    return 0 if messages == ["ok"] else 1
+
+
+def cmd_vacuum(db, args):
+    result = db.vacuum()
+    if result is None:
+        print("VACUUM nie powiodło się.")
+        return 1
+    before, after = result
+    print(f"Rozmiar bazy: {before / 1024:.1f} KiB -> {after / 1024:.1f} KiB")
+    return 0
+
+
+def cmd_sync(db, args):
+    from data.sync import SyncManager
+
+    if not os.path.exists(args.peer):
+        print(f"Brak pliku bazy: {args.peer}")
+        return 1
+    local = SyncManager(db)
+    peer = SyncManager(DatabaseManager(db_path=args.peer))
+    sent, received = local.sync_with(peer)
+    print(f"Wysłano: {sent['applied']} zmian ({sent['skipped']} pominiętych), "
+          f"odebrano: {received['applied']} zmian ({received['skipped']} pominiętych).")
+    return 0
+
+
+def cmd_size(db, args):
+    from data.retention import RetentionManager
+
+    report = RetentionManager(db, archive_path=args.archive).size_report()
+    print(f"Plik bazy: {report['file_bytes'] / 1024:.1f} KiB "
+          f"({report['page_count']} stron po {report['page_size']} B, wolnych: {report['free_pages']}), "
+          f"auto_vacuum: {report['auto_vacuum']}")
+    print(f"Archiwum: {report['archive_bytes'] / 1024:.1f} KiB")
+    print(f"{'Tabela':<24} {'Wiersze':>9} {'KiB':>9}")
+    for table, info in report["tables"].items():
+        size = f"{info['bytes'] / 1024:.1f}" if info["bytes"] is not None else "?"
+        print(f"{table:<24} {info['rows']:>9} {size:>9}")
+    return 0
+
+
+def cmd_retention(db, args):
+    from data.retention import RetentionManager
+
+    retention = RetentionManager(db, archive_path=args.archive)
+    moved = retention.apply_policies()
+    for table, count in moved.items():
+        print(f"{table}: przeniesiono {count} wierszy do archiwum")
+    print(f"Zwolniono stron: {retention.incremental_vacuum(max_pages=0 if args.full else None)}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m adhd", description="ADHD Support App – CLI")
+    parser.add_argument("--db", default=DEFAULT_DB, help="ścieżka pliku bazy")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    tasks = commands.add_parser("tasks", help="lista zadań (domyślnie niezakończone)")
+    tasks.add_argument("--all", action="store_true", help="wszystkie zadania ze szczegółami")
+    tasks.add_argument("--date", help="zadania z terminem w danym dniu (YYYY-MM-DD)")
+    tasks.add_argument("--limit", type=int, default=50)
+    tasks.set_defaults(func=cmd_tasks)
+
+    mood = commands.add_parser("add-mood", help="zapisz nastrój")
+    mood.add_argument("mood")
+    mood.add_argument("--date", default=time.strftime("%Y-%m-%d"))
+    mood.add_argument("--notes", default="")
+    mood.add_argument("--energy", type=int, default=5)
+    mood.add_argument("--focus", type=int, default=5)
+    mood.set_defaults(func=cmd_add_mood)
+
+    report = commands.add_parser("report", help="podsumowanie sesji Pomodoro i nastrojów")
+    report.add_argument("--days", type=int, default=7)
+    report.set_defaults(func=cmd_report)
+
+    check = commands.add_parser("check", help="sprawdzenie spójności bazy")
+    check.add_argument("--quick", action="store_true", help="PRAGMA quick_check zamiast integrity_check")
+    check.set_defaults(func=cmd_check)
+
+    vacuum = commands.add_parser("vacuum", help="odzyskanie miejsca w pliku bazy")
+    vacuum.set_defaults(func=cmd_vacuum)
+
+    sync = commands.add_parser("sync", help="synchronizacja przyrostowa z drugą kopią bazy")
+    sync.add_argument("peer", help="ścieżka pliku drugiej bazy")
+    sync.set_defaults(func=cmd_sync)
+
+    size = commands.add_parser("size", help="raport rozmiaru bazy i tabel")
+    size.add_argument("--archive", default="data/adhd_archive.db")
+    size.set_defaults(func=cmd_size)
+
+    retention = commands.add_parser("retention", help="archiwizacja starych danych i kompaktowanie")
+    retention.add_argument("--archive", default="data/adhd_archive.db")
+    retention.add_argument("--full", action="store_true", help="zwolnij wszystkie wolne strony naraz")
+    retention.set_defaults(func=cmd_retention)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    directory = os.path.dirname(args.db)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    try:
+        db = DatabaseManager(db_path=args.db)
+        return args.func(db, args)
+    except MigrationError as e:
+        print(e)
+        return 1
@@ -7,6 +7,7 @@ import pyaudio
 import os
 from huggingface_hub import hf_hub_download
 import urllib.request
+from ai.emotion_fusion import VIDEO_LABELS, AUDIO_LABELS
 
 logger = logging.getLogger(__name__)
 
@@ -36,22 +37,8 @@ class EmotionAnalyzer:
         self.video_emotion_model = self._load_tf_model(video_model_path, "wideo")
         self.audio_emotion_model = self._load_tf_model(audio_model_path, "audio")
 
-        self.emotion_labels = {
-            0: 'Angry',
-            1: 'Disgust',
-            2: 'Fear',
-            3: 'Happy',
-            4: 'Sad',
-            5: 'Surprise',
-            6: 'Neutral'
-        }
-
-        self.audio_emotion_labels = {
-            0: 'Calm',
-            1: 'Happy',
-            2: 'Sad',
-            3: 'Angry'
-        }
+        self.emotion_labels = dict(enumerate(VIDEO_LABELS))
+        self.audio_emotion_labels = dict(enumerate(AUDIO_LABELS))
 
     def _download_file(self, path, url, retries=3):
         for attempt in range(retries):
@@ -85,38 +72,51 @@ class EmotionAnalyzer:
             logger.error(f"Błąd ładowania {model_type}: {e}")
             return None
 
-    def analyze_video_frame(self, frame):
-        if self.video_emotion_model is None:
-            logger.warning("Model wideo niedostępny.")
-            return "Neutral"
+    def predict_video_probs(self, frame):
+        """
+        Prawdopodobieństwa klas VIDEO_LABELS (float32[7]) dla pierwszej twarzy w klatce BGR.
+        None, gdy model jest niedostępny albo nie wykryto twarzy.
+        """
+        if self.video_emotion_model is None or frame is None:
+            return None
 
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
-
         if len(faces) == 0:
-            logger.info("Brak wykrytych twarzy.")
-            return "Neutral"
+            return None
 
         (x, y, w, h) = faces[0]
         face = cv2.resize(gray[y:y+h, x:x+w], (48, 48)) / 255.0
         face = np.expand_dims(face, axis=(0, -1))
+        return self.video_emotion_model.predict(face, verbose=0)[0].astype(np.float32)
+
+    def predict_audio_probs(self, audio_data, sr=22050):
+        """Prawdopodobieństwa klas AUDIO_LABELS (float32[4]) dla okna audio; None bez modelu/danych."""
+        if self.audio_emotion_model is None or audio_data is None or len(audio_data) == 0:
+            return None
 
-        pred = self.video_emotion_model.predict(face)
-        emotion = self.emotion_labels[np.argmax(pred)]
+        mfcc = librosa.feature.mfcc(y=np.asarray(audio_data, dtype=np.float32), sr=sr, n_mfcc=40)
+        mfcc_mean = np.mean(mfcc.T, axis=0)
+        input_features = np.expand_dims(mfcc_mean, axis=(0, -1))
+        return self.audio_emotion_model.predict(input_features, verbose=0)[0].astype(np.float32)
+
+    def analyze_video_frame(self, frame):
+        probs = self.predict_video_probs(frame)
+        if probs is None:
+            logger.info("Brak modelu wideo albo wykrytej twarzy.")
+            return "Neutral"
+
+        emotion = self.emotion_labels[int(np.argmax(probs))]
         logger.info(f"Emocja wideo: {emotion}")
         return emotion
 
     def analyze_audio(self, audio_data, sr=22050):
-        if self.audio_emotion_model is None:
-            logger.warning("Model audio niedostępny.")
+        probs = self.predict_audio_probs(audio_data, sr)
+        if probs is None:
+            logger.warning("Model audio niedostępny albo brak nagrania.")
             return "Neutral"
 
-        mfcc = librosa.feature.mfcc(y=audio_data, sr=sr, n_mfcc=40)
-        mfcc_mean = np.mean(mfcc.T, axis=0)
-        input_features = np.expand_dims(mfcc_mean, axis=(0, -1))
-
-        pred = self.audio_emotion_model.predict(input_features)
-        emotion = self.audio_emotion_labels[np.argmax(pred)]
+        emotion = self.audio_emotion_labels[int(np.argmax(probs))]
         logger.info(f"Emocja audio: {emotion}")
         return emotion
 
@@ -134,6 +134,8 @@ class EmotionAnalyzer:
         p.terminate()
 
         audio = np.hstack(frames).astype(np.float32)
-        audio /= np.max(np.abs(audio))
+        peak = np.max(np.abs(audio))
+        if peak > 0:  # cisza – bez dzielenia przez zero
+            audio /= peak
         logger.info("Nagrywanie zakończone.")
         return audio
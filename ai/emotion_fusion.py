@@ -0,0 +1,156 @@
+import math
+import time
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Kolejność klas na wyjściu modeli (indeks = numer klasy)
+VIDEO_LABELS = ("Angry", "Disgust", "Fear", "Happy", "Sad", "Surprise", "Neutral")
+AUDIO_LABELS = ("Calm", "Happy", "Sad", "Angry")
+
+# Słownik nastrojów aplikacji (AdvancedMoodDialog)
+MOODS = ("Dobry", "Neutralny", "Zły", "Stres", "Euforia")
+
+# Rzutowanie klas modeli na nastroje aplikacji: wiersz = klasa modelu, kolumny jak MOODS
+VIDEO_TO_MOOD = np.array([
+    # Dobry Neutr. Zły   Stres Euforia
+    [0.0,  0.0,  0.7,  0.3,  0.0],   # Angry
+    [0.0,  0.0,  1.0,  0.0,  0.0],   # Disgust
+    [0.0,  0.0,  0.2,  0.8,  0.0],   # Fear
+    [0.7,  0.0,  0.0,  0.0,  0.3],   # Happy
+    [0.0,  0.0,  1.0,  0.0,  0.0],   # Sad
+    [0.0,  0.2,  0.0,  0.4,  0.4],   # Surprise
+    [0.0,  1.0,  0.0,  0.0,  0.0],   # Neutral
+], dtype=np.float32)
+AUDIO_TO_MOOD = np.array([
+    [0.4,  0.6,  0.0,  0.0,  0.0],   # Calm
+    [0.6,  0.0,  0.0,  0.0,  0.4],   # Happy
+    [0.0,  0.0,  1.0,  0.0,  0.0],   # Sad
+    [0.0,  0.0,  0.5,  0.5,  0.0],   # Angry
+], dtype=np.float32)
+
+# Typowa energia i skupienie (skala 1-10) dla każdego nastroju – do oszacowania poziomów
+MOOD_ENERGY = np.array([6.0, 5.0, 3.0, 7.0, 9.0], dtype=np.float32)
+MOOD_FOCUS = np.array([7.0, 6.0, 4.0, 3.0, 5.0], dtype=np.float32)
+
+SOURCES = {
+    "video": (VIDEO_LABELS, VIDEO_TO_MOOD),
+    "audio": (AUDIO_LABELS, AUDIO_TO_MOOD),
+}
+
+class EmotionFusion:
+    """
+    Łączenie strumieni emocji z wideo i audio w jeden stan nastroju.
+
+    Każde źródło ma bufor pierścieniowy NumPy (czas + wektor prawdopodobieństw
+    klas) i wygładzanie wykładnicze (EMA) zależne od odstępu między próbkami,
+    więc wideo (kilka klatek na sekundę) i audio (okno co kilka sekund) ważą
+    się sprawiedliwie. Stan = średnia z EMA i głosowania większościowego
+    w oknie `window` sekund, przeliczona na nastroje aplikacji (MOODS)
+    oraz szacunkowe poziomy energii i skupienia.
+
+    `update()` wołają wątki przechwytywania, `state()` – interfejs; odczyt
+    nie uruchamia żadnej inferencji, tylko składa gotowe bufory.
+    """
+
+    def __init__(self, window=30.0, smoothing=5.0, capacity=512, weights=None, clock=time.monotonic):
+        """
+        window: ile sekund wstecz biorą udział w głosowaniu i liczą się jako „świeże”.
+        smoothing: stała czasowa EMA w sekundach.
+        capacity: rozmiar bufora pierścieniowego na źródło.
+        weights: waga źródeł przy łączeniu, domyślnie wideo 0.6, audio 0.4.
+        """
+        self.window = window
+        self.smoothing = smoothing
+        self.capacity = capacity
+        self.weights = weights or {"video": 0.6, "audio": 0.4}
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buffers = {}
+        for source, (labels, _mapping) in SOURCES.items():
+            self._buffers[source] = {
+                "times": np.full(capacity, -np.inf),
+                "probs": np.zeros((capacity, len(labels)), dtype=np.float32),
+                "head": 0,
+                "ema": None,
+                "last": None,
+            }
+
+    def update(self, source, probs, timestamp=None):
+        """Dodaje wektor prawdopodobieństw klas modelu `source` ("video" albo "audio")."""
+        timestamp = self._clock() if timestamp is None else timestamp
+        probs = np.asarray(probs, dtype=np.float32).ravel()
+        buffer = self._buffers[source]
+        if probs.size != buffer["probs"].shape[1]:
+            logger.warning(f"Nieoczekiwana liczba klas dla {source}: {probs.size}")
+            return
+
+        with self._lock:
+            index = buffer["head"] % self.capacity
+            buffer["times"][index] = timestamp
+            buffer["probs"][index] = probs
+            buffer["head"] += 1
+
+            if buffer["ema"] is None or buffer["last"] is None:
+                buffer["ema"] = probs.copy()
+            else:
+                # Im dłuższa przerwa od poprzedniej próbki, tym większa waga nowej
+                alpha = 1.0 - math.exp(-max(timestamp - buffer["last"], 0.0) / self.smoothing)
+                buffer["ema"] += alpha * (probs - buffer["ema"])
+            buffer["last"] = timestamp
+
+    def reset(self):
+        with self._lock:
+            for buffer in self._buffers.values():
+                buffer["times"].fill(-np.inf)
+                buffer["head"] = 0
+                buffer["ema"] = None
+                buffer["last"] = None
+
+    def state(self, now=None):
+        """
+        Bieżący połączony stan albo None, gdy żadne źródło nie ma świeżych próbek:
+        {"mood", "energy_level", "focus_level", "confidence", "samples", "scores", "sources"}.
+        """
+        now = self._clock() if now is None else now
+        fused = np.zeros(len(MOODS), dtype=np.float32)
+        total_weight = 0.0
+        samples = 0
+        sources = {}
+
+        with self._lock:
+            for source, buffer in self._buffers.items():
+                if buffer["last"] is None or now - buffer["last"] > self.window:
+                    continue
+                labels, mapping = SOURCES[source]
+                recent = buffer["times"] >= now - self.window
+                window_probs = buffer["probs"][recent]
+
+                # Głosowanie: każda próbka z okna oddaje jeden głos na najbardziej prawdopodobny nastrój
+                votes = np.bincount(np.argmax(window_probs @ mapping, axis=1), minlength=len(MOODS))
+                vote_share = votes / max(votes.sum(), 1)
+                smoothed = buffer["ema"] @ mapping
+                smoothed = smoothed / max(float(smoothed.sum()), 1e-6)
+
+                weight = self.weights.get(source, 0.0)
+                fused += weight * (0.5 * smoothed + 0.5 * vote_share)
+                total_weight += weight
+                samples += int(recent.sum())
+                sources[source] = labels[int(np.argmax(buffer["ema"]))]
+
+        if total_weight == 0.0:
+            return None
+
+        fused /= total_weight
+        best = int(np.argmax(fused))
+        return {
+            "mood": MOODS[best],
+            "energy_level": int(np.clip(np.rint(fused @ MOOD_ENERGY), 1, 10)),
+            "focus_level": int(np.clip(np.rint(fused @ MOOD_FOCUS), 1, 10)),
+            "confidence": float(fused[best]),
+            "samples": samples,
+            "scores": dict(zip(MOODS, fused.tolist())),
+            "sources": sources,
+        }
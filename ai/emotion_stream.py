@@ -0,0 +1,137 @@
+import time
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class EmotionStream:
+    """
+    Ciągłe przechwytywanie kamery i mikrofonu w wątkach w tle.
+
+    Wątek wideo co `video_interval` s bierze klatkę z kamery, wątek audio
+    czyta mikrofon bez przerw do bufora pierścieniowego i co `audio_hop` s
+    ocenia ostatnie `audio_window` s nagrania. Wyniki (wektory
+    prawdopodobieństw klas) trafiają do EmotionFusion, a opcjonalnie także
+    do EmotionTimeSeries. Interfejs nigdy nie czeka na kamerę ani model.
+
+    analyzer: obiekt z metodami predict_video_probs(frame) i
+    predict_audio_probs(audio, sr) – EmotionAnalyzer albo klient procesu
+    inferencji. Brak kamery/mikrofonu wyłącza tylko dany wątek.
+    """
+
+    def __init__(self, analyzer, fusion, timeseries=None, camera_index=0, video_interval=0.5,
+                 audio_window=3.0, audio_hop=1.5, sample_rate=22050, chunk=1024):
+        self.analyzer = analyzer
+        self.fusion = fusion
+        self.timeseries = timeseries
+        self.camera_index = camera_index
+        self.video_interval = video_interval
+        self.audio_window = audio_window
+        self.audio_hop = audio_hop
+        self.sample_rate = sample_rate
+        self.chunk = chunk
+
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self, video=True, audio=True):
+        if self._threads:
+            return
+        self._stop.clear()
+        targets = [(self._video_loop, "emotion-video")] if video else []
+        targets += [(self._audio_loop, "emotion-audio")] if audio else []
+        for target, name in targets:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self.timeseries is not None:
+            self.timeseries.flush()
+
+    def _publish(self, source, probs):
+        if probs is None:
+            return
+        timestamp = time.time()
+        self.fusion.update(source, probs)
+        if self.timeseries is not None:
+            self.timeseries.append(source, probs, timestamp)
+
+    # ----- Wideo -----
+    def _video_loop(self):
+        import cv2  # ładowane dopiero, gdy strumień wideo faktycznie startuje
+
+        capture = cv2.VideoCapture(self.camera_index)
+        if not capture.isOpened():
+            logger.warning(f"Kamera {self.camera_index} niedostępna – strumień wideo wyłączony.")
+            return
+        logger.info("Strumień wideo uruchomiony.")
+        try:
+            while not self._stop.is_set():
+                started = time.monotonic()
+                ok, frame = capture.read()
+                if ok:
+                    try:
+                        self._publish("video", self.analyzer.predict_video_probs(frame))
+                    except Exception as e:
+                        logger.error(f"Błąd analizy klatki: {e}")
+                self._stop.wait(max(self.video_interval - (time.monotonic() - started), 0.0))
+        finally:
+            capture.release()
+
+    # ----- Audio -----
+    def _audio_loop(self):
+        import pyaudio
+
+        window = int(self.audio_window * self.sample_rate)
+        ring = np.zeros(window, dtype=np.float32)
+        position = 0
+        filled = 0
+        since_last = 0
+        hop = int(self.audio_hop * self.sample_rate)
+
+        p = pyaudio.PyAudio()
+        try:
+            stream = p.open(format=pyaudio.paInt16, channels=1, rate=self.sample_rate,
+                            input=True, frames_per_buffer=self.chunk)
+        except Exception as e:
+            logger.warning(f"Mikrofon niedostępny – strumień audio wyłączony: {e}")
+            p.terminate()
+            return
+        logger.info("Strumień audio uruchomiony.")
+        try:
+            while not self._stop.is_set():
+                data = np.frombuffer(stream.read(self.chunk, exception_on_overflow=False), dtype=np.int16)
+                n = min(data.size, window)
+                end = position + n
+                if end <= window:
+                    ring[position:end] = data[-n:] / 32768.0
+                else:
+                    split = window - position
+                    ring[position:] = data[-n:-n + split] / 32768.0
+                    ring[:end - window] = data[-n + split:] / 32768.0
+                position = end % window
+                filled = min(filled + n, window)
+                since_last += n
+                if filled < window or since_last < hop:
+                    continue
+                since_last = 0
+
+                # Najstarsze próbki od bieżącej pozycji zapisu
+                audio = np.concatenate((ring[position:], ring[:position]))
+                peak = np.max(np.abs(audio))
+                if peak > 0:
+                    audio /= peak
+                try:
+                    self._publish("audio", self.analyzer.predict_audio_probs(audio, self.sample_rate))
+                except Exception as e:
+                    logger.error(f"Błąd analizy audio: {e}")
+        finally:
+            stream.stop_stream()
+            stream.close()
+            p.terminate()
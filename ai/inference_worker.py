@@ -0,0 +1,251 @@
+import time
+import queue
+import logging
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VIDEO = "video"
+AUDIO = "audio"
+
+def _attach(name):
+    """
+    Dołącza do bloku pamięci współdzielonej rodzica. Proces uruchomiony przez
+    „spawn” dzieli z rodzicem resource_tracker, więc ponowna rejestracja nazwy
+    niczego nie zmienia – blok usuwa tylko rodzic (unlink w stop()).
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+def _worker_main(requests, responses, buffer_names, analyzer_factory, analyzer_kwargs):
+    """Pętla procesu inferencji: modele ładowane tylko tutaj, dane czytane wprost z pamięci współdzielonej."""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    if analyzer_factory is None:
+        from ai.emotion_analyzer import EmotionAnalyzer
+        analyzer_factory = EmotionAnalyzer
+
+    analyzer = analyzer_factory(**analyzer_kwargs)
+    buffers = {kind: _attach(name) for kind, name in buffer_names.items()}
+    for kind in responses:
+        responses[kind].put(("ready", None))
+
+    try:
+        while True:
+            message = requests.get()
+            if message is None:
+                break
+            kind, request_id, shape, sample_rate = message
+            try:
+                if kind == VIDEO:
+                    frame = np.ndarray(shape, dtype=np.uint8, buffer=buffers[VIDEO].buf)
+                    probs = analyzer.predict_video_probs(frame)
+                    del frame
+                else:
+                    audio = np.ndarray(shape, dtype=np.float32, buffer=buffers[AUDIO].buf)
+                    probs = analyzer.predict_audio_probs(audio, sample_rate)
+                    del audio
+            except Exception as e:
+                logger.error(f"Błąd inferencji ({kind}): {e}")
+                probs = None
+            # Wynik to kilka liczb – w kolejce lecą tylko małe komunikaty
+            responses[kind].put((request_id, None if probs is None else probs.tolist()))
+    finally:
+        for shm in buffers.values():
+            shm.close()
+
+
+class InferenceWorker:
+    """
+    Proces potomny z modelami emocji (TensorFlow/Keras) – poza procesem GUI.
+
+    Klatki i okna audio są kopiowane do bloków `multiprocessing.shared_memory`
+    należących do tego obiektu, a proces potomny czyta je bezpośrednio
+    (widok NumPy na tym samym buforze, bez serializacji tablic). Kolejkami
+    idą tylko krótkie komunikaty: rodzaj, numer żądania, kształt i wynik.
+
+    Ma ten sam interfejs co EmotionAnalyzer (predict_video_probs,
+    predict_audio_probs), więc można go podać do EmotionStream. Gdy proces
+    padnie albo nie odpowiada, wywołania od razu zwracają None (wynik
+    „zdegradowany”), a proces jest uruchamiany ponownie z rosnącym
+    odstępem (restart_delay, podwajany do max_restart_delay).
+    """
+
+    def __init__(self, max_frame_shape=(1080, 1920, 3), max_audio_seconds=10.0, sample_rate=22050,
+                 timeout=5.0, restart_delay=1.0, max_restart_delay=60.0,
+                 analyzer_factory=None, analyzer_kwargs=None):
+        """
+        analyzer_factory: funkcja/klasa na poziomie modułu tworząca analizator w procesie
+        potomnym (domyślnie EmotionAnalyzer); analyzer_kwargs – jej argumenty.
+        """
+        self.max_frame_shape = tuple(max_frame_shape)
+        self.max_audio_samples = int(max_audio_seconds * sample_rate)
+        self.timeout = timeout
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.analyzer_factory = analyzer_factory
+        self.analyzer_kwargs = analyzer_kwargs or {}
+
+        self._context = multiprocessing.get_context("spawn")  # bez dziedziczenia stanu Qt po fork()
+        self._buffers = {}
+        self._locks = {VIDEO: threading.Lock(), AUDIO: threading.Lock()}
+        self._state_lock = threading.Lock()
+        self._process = None
+        self._requests = None
+        self._responses = None
+        self._ready = set()   # rodzaje, dla których proces potwierdził załadowanie modeli
+        self._request_id = 0
+        self._restarts = 0
+        self._next_start = 0.0
+        self._stopped = True
+
+    # ----- Cykl życia -----
+    def start(self):
+        with self._state_lock:
+            if not self._buffers:
+                self._buffers = {
+                    VIDEO: shared_memory.SharedMemory(create=True, size=int(np.prod(self.max_frame_shape))),
+                    AUDIO: shared_memory.SharedMemory(create=True, size=self.max_audio_samples * 4),
+                }
+            self._stopped = False
+            self._spawn()
+
+    def stop(self):
+        with self._state_lock:
+            self._stopped = True
+            self._terminate()
+            for shm in self._buffers.values():
+                shm.close()
+                shm.unlink()
+            self._buffers = {}
+
+    @property
+    def is_alive(self):
+        return self._process is not None and self._process.is_alive()
+
+    def _spawn(self):
+        self._requests = self._context.Queue()
+        self._responses = {VIDEO: self._context.Queue(), AUDIO: self._context.Queue()}
+        self._ready = set()
+        self._process = self._context.Process(
+            target=_worker_main,
+            args=(self._requests, self._responses, {kind: shm.name for kind, shm in self._buffers.items()},
+                  self.analyzer_factory, self.analyzer_kwargs),
+            name="emotion-inference",
+            daemon=True,
+        )
+        self._process.start()
+        logger.info(f"Proces inferencji uruchomiony (pid {self._process.pid}).")
+
+    def _terminate(self):
+        if self._process is None:
+            return
+        if self._process.is_alive():
+            self._requests.put(None)
+            self._process.join(self.timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join()
+        # Kolejki mogły zostać uszkodzone przez przerwany proces – przy restarcie powstają nowe
+        for q in [self._requests, *self._responses.values()]:
+            q.cancel_join_thread()
+            q.close()
+        self._process = None
+
+    def _ensure_running(self):
+        """True, gdy proces działa; po awarii restart najwcześniej po odczekaniu odstępu."""
+        with self._state_lock:
+            if self._stopped:
+                return False
+            if self.is_alive:
+                return True
+            now = time.monotonic()
+            if now < self._next_start:
+                return False
+            if self._process is not None:
+                logger.warning(f"Proces inferencji zakończył się (kod {self._process.exitcode}) – restart.")
+                self._terminate()
+            delay = min(self.restart_delay * (2 ** self._restarts), self.max_restart_delay)
+            self._restarts += 1
+            self._next_start = now + delay
+            self._spawn()
+            return True
+
+    def _restart(self):
+        """Proces nie odpowiada – kończymy go; następne wywołanie uruchomi nowy."""
+        with self._state_lock:
+            if self._process is not None and self._process.is_alive():
+                logger.warning("Proces inferencji nie odpowiada – zatrzymywanie.")
+                self._process.terminate()
+
+    # ----- Inferencja -----
+    def predict_video_probs(self, frame):
+        if frame is None:
+            return None
+        frame = np.asarray(frame, dtype=np.uint8)
+        if not self._buffers:
+            return None
+        if frame.nbytes > self._buffers[VIDEO].size:
+            logger.warning(f"Klatka {frame.shape} większa niż bufor {self.max_frame_shape} – pominięta.")
+            return None
+        return self._request(VIDEO, frame, None)
+
+    def predict_audio_probs(self, audio_data, sr=22050):
+        if audio_data is None or len(audio_data) == 0:
+            return None
+        audio = np.asarray(audio_data, dtype=np.float32)[-self.max_audio_samples:]
+        return self._request(AUDIO, audio, sr)
+
+    def _request(self, kind, array, sample_rate):
+        # Jedno żądanie danego rodzaju naraz – bufor i kolejka odpowiedzi są per rodzaj
+        with self._locks[kind]:
+            if not self._ensure_running():
+                return None
+            requests, responses = self._requests, self._responses[kind]
+            if not self._wait_ready(kind, responses):
+                return None
+
+            shm = self._buffers[kind]
+            view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+            view[...] = array
+            del view
+
+            self._request_id += 1
+            request_id = self._request_id
+            requests.put((kind, request_id, array.shape, sample_rate))
+
+            process = self._process
+            deadline = time.monotonic() + self.timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    # Krótkie porcje czekania – śmierć procesu wykrywamy od razu, nie po timeout
+                    response_id, probs = responses.get(timeout=min(max(remaining, 0.0), 0.1))
+                except queue.Empty:
+                    if not process.is_alive():
+                        return None
+                    if remaining <= 0:
+                        self._restart()
+                        return None
+                    continue
+                if response_id == request_id:
+                    self._restarts = 0  # proces działa poprawnie – reset odstępu restartów
+                    return None if probs is None else np.asarray(probs, dtype=np.float32)
+                # Spóźniona odpowiedź na wcześniejsze żądanie (po przekroczeniu czasu) – pomijamy
+
+    def _wait_ready(self, kind, responses):
+        """Do czasu załadowania modeli w procesie potomnym wyniki są zdegradowane (None), bez blokowania."""
+        if kind in self._ready:
+            return True
+        while True:
+            try:
+                message, _ = responses.get(timeout=0.1)
+            except queue.Empty:
+                return False  # modele jeszcze się ładują – wynik zdegradowany
+            if message == "ready":
+                self._ready.add(kind)
+                return True
@@ -0,0 +1,115 @@
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PomodoroTimer:
+    """
+    Silnik odliczania Pomodoro oparty na czasie monotonicznym.
+
+    Nie zależy od Qt – nie trzyma własnego timera, tylko liczy upływ czasu
+    z `time.monotonic()`, więc zmiana zegara systemowego ani opóźnione
+    zdarzenia pętli nie powodują dryfu. Widget pyta silnik, ile zostało do
+    najbliższej zmiany wyświetlanej wartości (`seconds_until_next_tick`),
+    i budzi pętlę zdarzeń dokładnie wtedy.
+    """
+
+    PHASE_IDLE = "idle"
+    PHASE_WORK = "work"
+    PHASE_BREAK = "break"
+
+    SHORT_BREAK = 5 * 60
+    LONG_BREAK = 15 * 60
+    LONG_BREAK_EVERY = 4  # co 4. przerwa jest długa
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self.phase = self.PHASE_IDLE
+        self.duration = 0
+        self.completed_work_phases = 0
+        self._elapsed_before = 0.0  # czas zebrany przed ostatnim wznowieniem
+        self._started_at = None     # odczyt zegara przy ostatnim wznowieniu; None = pauza
+
+    # ----- Stan -----
+    @property
+    def is_active(self):
+        return self.phase != self.PHASE_IDLE
+
+    @property
+    def is_running(self):
+        return self._started_at is not None
+
+    @property
+    def is_paused(self):
+        return self.is_active and self._started_at is None
+
+    def elapsed(self):
+        """Czas (w sekundach) faktycznie odliczony w bieżącej fazie, bez pauz."""
+        if self._started_at is None:
+            return self._elapsed_before
+        return self._elapsed_before + (self._clock() - self._started_at)
+
+    def remaining(self):
+        return max(0.0, self.duration - self.elapsed())
+
+    def is_finished(self):
+        return self.is_active and self.remaining() <= 0
+
+    def display_seconds(self):
+        """Wartość pokazywana użytkownikowi – pełne sekundy, zaokrąglone w górę."""
+        remaining = self.remaining()
+        whole = int(remaining)
+        return whole if whole == remaining else whole + 1
+
+    def seconds_until_next_tick(self):
+        """
+        Ile sekund do najbliższej zmiany `display_seconds()`.
+        None, jeśli timer stoi (pauza/brak fazy) – wtedy nie trzeba budzić pętli.
+        """
+        if not self.is_running:
+            return None
+        remaining = self.remaining()
+        if remaining <= 0:
+            return 0.0
+        fraction = remaining - int(remaining)
+        return fraction if fraction > 0 else 1.0
+
+    # ----- Sterowanie -----
+    def start(self, duration_seconds, phase=PHASE_WORK, elapsed=0.0, paused=False):
+        """Rozpoczyna fazę; `elapsed` pozwala wznowić fazę z checkpointu."""
+        self.phase = phase
+        self.duration = int(duration_seconds)
+        self._elapsed_before = float(elapsed)
+        self._started_at = None if paused else self._clock()
+        logger.info(f"Start fazy {phase}: {self.duration}s (odliczone {int(elapsed)}s).")
+
+    def start_break(self):
+        """Przerwa po zakończonej fazie pracy – co kilka faz przerwa jest dłuższa."""
+        if self.completed_work_phases and self.completed_work_phases % self.LONG_BREAK_EVERY == 0:
+            duration = self.LONG_BREAK
+        else:
+            duration = self.SHORT_BREAK
+        self.start(duration, phase=self.PHASE_BREAK)
+        return duration
+
+    def pause(self):
+        if self._started_at is None:
+            return
+        self._elapsed_before = self.elapsed()
+        self._started_at = None
+
+    def resume(self):
+        if not self.is_active or self._started_at is not None:
+            return
+        self._started_at = self._clock()
+
+    def stop(self):
+        """Kończy bieżącą fazę i zwraca odliczony czas w sekundach."""
+        elapsed = self.elapsed()
+        if self.phase == self.PHASE_WORK and elapsed >= self.duration:
+            self.completed_work_phases += 1
+        self.phase = self.PHASE_IDLE
+        self.duration = 0
+        self._elapsed_before = 0.0
+        self._started_at = None
+        return elapsed
@@ -0,0 +1,155 @@
+import time
+import heapq
+import logging
+import itertools
+from datetime import date
+
+from data.database import PRIORITY_RANK
+
+logger = logging.getLogger(__name__)
+
+class TaskScheduler:
+    """
+    Podpowiedź „co robić teraz” – kolejka priorytetowa (kopiec) otwartych zadań.
+
+    Każde zadanie dostaje punktację z priorytetu, bliskości terminu,
+    dotychczasowego focus_score i ostatniego nastroju (energia/skupienie).
+    Zmiana jednego zadania to wstawienie nowego wpisu do kopca – O(log n);
+    poprzedni wpis jest tylko oznaczany jako nieaktualny i wyrzucany
+    dopiero, gdy trafi na szczyt (leniwe usuwanie). Pełna przebudowa
+    (O(n)) jest potrzebna tylko przy zmianie nastroju albo dnia, bo wtedy
+    zmieniają się punkty wszystkich zadań naraz.
+    """
+
+    PRIORITY_WEIGHT = 10.0
+    URGENCY_WEIGHT = 12.0   # termin dziś; przeterminowane dostają OVERDUE_BONUS więcej
+    OVERDUE_BONUS = 3.0
+    MOOD_FIT_WEIGHT = 6.0
+    FOCUS_WEIGHT = 4.0
+
+    def __init__(self, db_manager, clock=time.time):
+        self.db_manager = db_manager
+        self._clock = clock
+        self._heap = []       # [-punkty, licznik, id zadania, zadanie albo None (usunięte)]
+        self._entries = {}    # id zadania -> aktualny wpis w kopcu
+        self._counter = itertools.count()  # rozstrzyga remisy bez porównywania słowników
+        self._day = None
+        self._last_refresh = None
+        self._capacity = 0.5  # energia i skupienie z ostatniego nastroju, 0..1
+
+    # ----- Punktacja -----
+    def set_mood(self, mood_entry):
+        """Nowy nastrój zmienia punkty wszystkich zadań – przebudowa kopca."""
+        self._set_capacity(mood_entry)
+        self._reheapify()
+
+    def score(self, task):
+        rank = PRIORITY_RANK.get(task["priority"], 0)
+        score = self.PRIORITY_WEIGHT * rank
+
+        if task.get("due_date"):
+            days_left = (date.fromisoformat(task["due_date"]) - self._day).days
+            if days_left < 0:
+                score += self.URGENCY_WEIGHT + self.OVERDUE_BONUS
+            else:
+                score += self.URGENCY_WEIGHT / (1 + days_left)
+
+        # Wymagające zadania przy wysokiej energii, lżejsze przy niskiej
+        demand = (rank - 1) / 2.0 if rank else 0.5
+        score += self.MOOD_FIT_WEIGHT * (1.0 - abs(demand - self._capacity))
+        # Przy słabszej formie premiujemy zadania, przy których wcześniej szło skupienie
+        score += self.FOCUS_WEIGHT * (task.get("focus_score") or 0.0) * (1.0 - self._capacity)
+        return score
+
+    # ----- Aktualizacje -----
+    def rebuild(self):
+        """Wczytuje wszystkie otwarte zadania na dziś i układa kopiec od nowa (O(n))."""
+        self._day = date.fromtimestamp(self._clock())
+        self._last_refresh = self._clock()
+        self._set_capacity(self.db_manager.get_latest_mood())
+        tasks = self.db_manager.get_open_tasks(self._day.isoformat())
+        self._heap = [self._entry(task) for task in tasks]
+        heapq.heapify(self._heap)
+        self._entries = {entry[2]: entry for entry in self._heap}
+        logger.debug(f"Harmonogram przebudowany: {len(self._heap)} zadań.")
+
+    def refresh(self):
+        """Dołącza zadania dodane lub zmienione od ostatniego odświeżenia."""
+        if self._ensure_current_day():
+            return
+        since = self._last_refresh
+        self._last_refresh = self._clock()
+        for task in self.db_manager.get_open_tasks(self._day.isoformat(), modified_since=since):
+            self._push(task)
+
+    def task_changed(self, task_id):
+        """Zadanie zmieniło się (edycja, status, wyjątek wystąpienia) – O(log n)."""
+        if self._ensure_current_day():
+            return
+        tasks = self.db_manager.get_open_tasks(self._day.isoformat(), task_ids=[int(task_id)])
+        if tasks:
+            self._push(tasks[0])
+        else:
+            self.task_removed(task_id)
+
+    def task_removed(self, task_id):
+        entry = self._entries.pop(int(task_id), None)
+        if entry is not None:
+            entry[3] = None
+
+    # ----- Odczyt -----
+    def best(self):
+        """Zadanie z najwyższą punktacją albo None."""
+        self._ensure_current_day()
+        self._drop_removed()
+        return self._heap[0][3] if self._heap else None
+
+    def top(self, n=3):
+        """n najlepszych zadań (O(n log m)) – kopiec zostaje nienaruszony."""
+        self._ensure_current_day()
+        result = []
+        while self._heap and len(result) < n:
+            entry = heapq.heappop(self._heap)
+            if entry[3] is not None:
+                result.append(entry)
+        for entry in result:
+            heapq.heappush(self._heap, entry)
+        return [entry[3] for entry in result]
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ----- Wewnętrzne -----
+    def _entry(self, task):
+        return [-self.score(task), next(self._counter), task["id"], task]
+
+    def _push(self, task):
+        self.task_removed(task["id"])
+        entry = self._entry(task)
+        self._entries[task["id"]] = entry
+        heapq.heappush(self._heap, entry)
+        if len(self._heap) > 2 * len(self._entries) + 32:
+            self._reheapify()  # za dużo nieaktualnych wpisów – sprzątanie, zamortyzowane O(1)
+
+    def _drop_removed(self):
+        while self._heap and self._heap[0][3] is None:
+            heapq.heappop(self._heap)
+
+    def _reheapify(self):
+        if self._day is None:
+            return
+        self._heap = [self._entry(entry[3]) for entry in self._heap if entry[3] is not None]
+        heapq.heapify(self._heap)
+        self._entries = {entry[2]: entry for entry in self._heap}
+
+    def _ensure_current_day(self):
+        """Pierwsze użycie albo nowy dzień – pilność terminów i wystąpienia się zmieniły. True = przebudowano."""
+        if self._day is None or date.fromtimestamp(self._clock()) != self._day:
+            self.rebuild()
+            return True
+        return False
+
+    def _set_capacity(self, mood_entry):
+        energy = (mood_entry or {}).get("energy_level") or 5
+        focus = (mood_entry or {}).get("focus_level") or 5
+        self._capacity = min(max((energy + focus) / 20.0, 0.0), 1.0)
@@ -0,0 +1,138 @@
+import threading
+import functools
+from collections import OrderedDict
+
+
+class QueryCache:
+    """
+    Ograniczony cache LRU wyników zapytań DatabaseManager.
+
+    Każdy wpis jest oznaczony tagami (tabela, klucz). Klucz None oznacza,
+    że wynik zależy od całej tabeli (np. get_moods), a konkretna wartość –
+    że zależy tylko od jednego klucza (np. daty w get_mood_by_date).
+    Zapis z kluczem unieważnia wpisy z tym kluczem oraz całotabelowe;
+    zapis bez klucza unieważnia wszystko z danej tabeli.
+
+    Każda tabela ma licznik pokoleń zwiększany przy unieważnieniu. Odczyt
+    pobiera go przed zapytaniem i przekazuje do put() – wynik policzony
+    przed równoległym zapisem nie trafi do cache po jego unieważnieniu.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # klucz zapytania -> (wynik, tagi)
+        self._by_table = {}            # tabela -> zbiór kluczy zapytań
+        self._generations = {}         # tabela -> licznik unieważnień
+        self._lock = threading.Lock()
+
+    def get(self, query_key):
+        """Zwraca (True, wynik) przy trafieniu albo (False, None)."""
+        with self._lock:
+            entry = self._entries.get(query_key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(query_key)
+            self.hits += 1
+            return True, entry[0]
+
+    def generation(self, table):
+        """Bieżące pokolenie tabeli – do pobrania przed wykonaniem zapytania."""
+        with self._lock:
+            return self._generations.get(table, 0)
+
+    def put(self, query_key, value, tags, generation=None):
+        """
+        generation: wynik generation() sprzed zapytania; jeśli któraś tabela z tagów
+        została w międzyczasie unieważniona, wynik jest nieaktualny i nie jest zapisywany.
+        """
+        with self._lock:
+            if generation is not None and any(
+                self._generations.get(table, 0) != generation for table, _key in tags
+            ):
+                return
+            if query_key in self._entries:
+                self._remove(query_key)
+            self._entries[query_key] = (value, tags)
+            for table, _key in tags:
+                self._by_table.setdefault(table, set()).add(query_key)
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, table, key=None):
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            for query_key in list(self._by_table.get(table, ())):
+                _value, tags = self._entries[query_key]
+                if key is None or (table, key) in tags or (table, None) in tags:
+                    self._remove(query_key)
+
+    def clear(self):
+        with self._lock:
+            for table in set(self._by_table) | set(self._generations):
+                self._generations[table] = self._generations.get(table, 0) + 1
+            self._entries.clear()
+            self._by_table.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _remove(self, query_key):
+        _value, tags = self._entries.pop(query_key)
+        for table, _key in tags:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(query_key)
+
+
+def cached(table, key_param=None):
+    """
+    Dekorator metod odczytu DatabaseManager – read-through przez `self.cache`.
+    key_param: nazwa argumentu, od którego wynik zależy (np. "date_str");
+    None = wynik zależy od całej tabeli.
+    Zwracane obiekty są współdzielone między wywołaniami – nie należy ich modyfikować.
+    """
+    def decorator(func):
+        # Nazwy parametrów bez `self` – do zbudowania klucza niezależnego od tego,
+        # czy argument podano pozycyjnie, czy nazwą (bez kosztownego `inspect`).
+        code = func.__code__
+        param_names = code.co_varnames[1:code.co_argcount]
+        defaults = dict(zip(param_names[len(param_names) - len(func.__defaults__ or ()):],
+                            func.__defaults__ or ()))
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if self.cache is None:
+                return func(self, *args, **kwargs)
+
+            arguments = dict(defaults)
+            arguments.update(zip(param_names, args))
+            arguments.update(kwargs)
+            query_key = (func.__name__, tuple(sorted(arguments.items())))
+
+            hit, value = self.cache.get(query_key)
+            if hit:
+                return value
+
+            # Pokolenie sprzed zapytania – zapis zatwierdzony w trakcie odczytu unieważni wynik
+            generation = self.cache.generation(table)
+            value = func(self, *args, **kwargs)
+            tag_key = arguments.get(key_param) if key_param else None
+            self.cache.put(query_key, value, {(table, tag_key)}, generation)
+            return value
+        return wrapper
+    return decorator
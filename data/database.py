@@ -1,81 +1,607 @@
 import sqlite3
 import os
+import re
+import json
+import hashlib
 import logging
-from datetime import datetime
+from datetime import date, datetime
+from data.cache import QueryCache, cached
+from data.write_queue import WriteBehindQueue
+from data.recurrence import occurrences
 
 logger = logging.getLogger(__name__)
 
+# Wersja schematu zapisywana w PRAGMA user_version.
+# 1 – pierwotny schemat z datami jako TEXT, 2 – znaczniki czasu jako INTEGER (epoch),
+# 3 – globalne identyfikatory wierszy (uid) i dziennik zmian do synchronizacji,
+# 4 – tabele podsumowań dla retencji i auto_vacuum = INCREMENTAL,
+# 5 – reguły powtarzania zadań i wyjątki pojedynczych wystąpień,
+# 6 – indeks tasks(modified_at) dla przyrostowego odświeżania harmonogramu.
+SCHEMA_VERSION = 6
+
+# Wszystkie znaczniki czasu trzymamy jako sekundy od epoki (UTC).
+# Daty dzienne (due_date, moods.date) to północ czasu lokalnego danego dnia.
+# Konwersje robi SQLite – Python nie parsuje dat w gorących ścieżkach.
+NOW_EPOCH = "CAST(strftime('%s', 'now') AS INTEGER)"
+LOCAL_TO_EPOCH = "CAST(strftime('%s', {value}, 'utc') AS INTEGER)"
+EPOCH_TO_DATE = "date({column}, 'unixepoch', 'localtime')"
+EPOCH_TO_DATETIME = "datetime({column}, 'unixepoch', 'localtime')"
+NOW_MS = "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+NEW_UID = "lower(hex(randomblob(16)))"
+
+# Priorytet jest zapisany jako TEXT – do sortowania i punktacji używamy rangi liczbowej
+PRIORITY_RANK = {"High": 3, "Medium": 2, "Low": 1}
+PRIORITY_RANK_SQL = "CASE {column} " + " ".join(
+    f"WHEN '{name}' THEN {rank}" for name, rank in PRIORITY_RANK.items()
+) + " ELSE 0 END"
+
+# Tabele śledzone w dzienniku zmian (change_log) i synchronizowane między kopiami bazy
+SYNCED_TABLES = ("tasks", "moods", "pomodoro_sessions")
+
+# Kolumny, z których przy migracji powstaje uid istniejących wierszy (razem z nazwą tabeli i id),
+# oraz czas ich ostatniej zmiany do pierwszego wpisu w change_log
+MIGRATED_UID_COLUMNS = {
+    "tasks": "id, created_at",
+    "moods": "id, date, mood",
+    "pomodoro_sessions": "id, start_time",
+}
+MIGRATED_CHANGED_AT = {
+    "tasks": "modified_at",
+    "moods": "date",
+    "pomodoro_sessions": "COALESCE(end_time, start_time)",
+}
+
+# Kolumny dat sprzed schematu 2 (TEXT) – pola w UI były wolnym tekstem, więc przed
+# konwersją na epoch wartości są normalizowane (_normalize_legacy_dates).
+# Wartość True = kolumna NOT NULL.
+LEGACY_DATE_COLUMNS = {
+    "tasks": {"due_date": False, "created_at": True, "modified_at": True},
+    "moods": {"date": True},
+    "pomodoro_sessions": {"start_time": False, "end_time": False, "checkpoint_time": False},
+}
+LEGACY_DATE_FORMATS = (
+    "%Y-%m-%d", "%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%dT%H:%M:%S",
+    "%d.%m.%Y", "%d.%m.%Y %H:%M", "%d.%m.%Y %H:%M:%S", "%d/%m/%Y", "%d-%m-%Y",
+    "%Y/%m/%d", "%Y.%m.%d", "%d.%m.%y",
+)
+_ISO_DATETIME = re.compile(r"\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?")
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+class MigrationError(Exception):
+    """Schematu bazy nie udało się zaktualizować – baza została w poprzedniej wersji."""
+
+
+def _normalize_legacy_date(text):
+    """Tekst daty z bazy sprzed migracji -> 'YYYY-MM-DD HH:MM:SS' albo None, gdy nie da się go odczytać."""
+    text = text.strip()
+    for fmt in LEGACY_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            continue
+    return None
+
+
+def validate_date(value, allow_empty=False):
+    """
+    Data w formacie YYYY-MM-DD albo ValueError. allow_empty: pusty tekst / None
+    oznacza brak daty (np. zadanie bez terminu) i zwracany jest "".
+    """
+    if value is None or (isinstance(value, str) and not value.strip()):
+        if allow_empty:
+            return ""
+        raise ValueError("Brak daty (oczekiwano RRRR-MM-DD).")
+    text = str(value).strip()
+    try:
+        if not _ISO_DATE.fullmatch(text):
+            raise ValueError
+        date.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"Niepoprawna data: {value!r} (oczekiwano RRRR-MM-DD).") from None
+    return text
+
+
+def _row_uid(*parts):
+    """Deterministyczny uid (SHA-1 z tabeli, id i czasu) – kopie migrowane osobno dostają te same."""
+    return hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:32]
+
+# Listy kolumn zwracające daty w dotychczasowym, tekstowym formacie
+TASK_COLUMNS = f"""
+    tasks.id, tasks.title, tasks.description, tasks.priority, tasks.status,
+    COALESCE({EPOCH_TO_DATE.format(column='tasks.due_date')}, '') AS due_date,
+    {EPOCH_TO_DATETIME.format(column='tasks.created_at')} AS created_at,
+    {EPOCH_TO_DATETIME.format(column='tasks.modified_at')} AS modified_at,
+    tasks.focus_score, tasks.recommended_session
+"""
+MOOD_COLUMNS = f"""
+    moods.id, {EPOCH_TO_DATE.format(column='moods.date')} AS date, moods.mood, moods.notes,
+    moods.energy_level, moods.focus_level
+"""
+SESSION_COLUMNS = f"""
+    pomodoro_sessions.id, pomodoro_sessions.task_id,
+    {EPOCH_TO_DATETIME.format(column='pomodoro_sessions.start_time')} AS start_time,
+    {EPOCH_TO_DATETIME.format(column='pomodoro_sessions.end_time')} AS end_time,
+    pomodoro_sessions.planned_duration, pomodoro_sessions.actual_duration,
+    pomodoro_sessions.completed, pomodoro_sessions.elapsed_seconds, pomodoro_sessions.paused,
+    {EPOCH_TO_DATETIME.format(column='pomodoro_sessions.checkpoint_time')} AS checkpoint_time
+"""
+
+# Kolumny sprzed schematu 3 (bez uid) – używane przy migracjach
+TASK_BASE_COLUMNS = (
+    "id, title, description, priority, status, due_date, created_at, modified_at, "
+    "focus_score, recommended_session"
+)
+MOOD_BASE_COLUMNS = "id, date, mood, notes, energy_level, focus_level"
+SESSION_BASE_COLUMNS = (
+    "id, task_id, start_time, end_time, planned_duration, actual_duration, completed, "
+    "elapsed_seconds, paused, checkpoint_time"
+)
+
+TABLE_SCHEMAS = {
+    # Tabela zadań - dodajmy kilka pól
+    "tasks": """
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT,
+            priority TEXT NOT NULL,
+            status TEXT NOT NULL,
+            due_date INTEGER,
+            created_at INTEGER NOT NULL,
+            modified_at INTEGER NOT NULL,
+            focus_score REAL,         -- ocena 'skupienia' - placeholder
+            recommended_session INTEGER, -- rekomendowana długość sesji
+            uid TEXT NOT NULL DEFAULT (lower(hex(randomblob(16))))  -- identyfikator wspólny dla kopii bazy
+        )
+    """,
+    # Tabela nastrojów - poszerzona
+    "moods": """
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date INTEGER NOT NULL,
+            mood TEXT NOT NULL,
+            notes TEXT,
+            energy_level INTEGER,
+            focus_level INTEGER,
+            uid TEXT NOT NULL DEFAULT (lower(hex(randomblob(16))))
+        )
+    """,
+    # Tabela pomodoro_sessions - do śledzenia sesji
+    "pomodoro_sessions": """
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER,
+            start_time INTEGER,
+            end_time INTEGER,
+            planned_duration INTEGER,
+            actual_duration INTEGER,
+            completed INTEGER,
+            elapsed_seconds INTEGER,  -- checkpoint odliczonego czasu
+            paused INTEGER,
+            checkpoint_time INTEGER,
+            uid TEXT NOT NULL DEFAULT (lower(hex(randomblob(16)))),
+            FOREIGN KEY (task_id) REFERENCES tasks(id)
+        )
+    """,
+    # Dziennik zmian – jeden wpis (najnowszy) na zmieniony wiersz
+    "change_log": """
+        CREATE TABLE IF NOT EXISTS {name} (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_uid TEXT NOT NULL,
+            op TEXT NOT NULL,            -- 'U' (wstawienie/zmiana), 'D' (usunięcie), 'A' (zarchiwizowany)
+            changed_at INTEGER NOT NULL, -- ms od epoki
+            origin TEXT NOT NULL         -- site_id bazy, w której powstała zmiana
+        )
+    """,
+    # site_id tej kopii bazy i flaga wyłączająca dziennik (przy nakładaniu zmian)
+    "sync_meta": """
+        CREATE TABLE IF NOT EXISTS {name} (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    """,
+    # Dzienne podsumowania szczegółów przeniesionych do archiwum (patrz data/retention.py)
+    "mood_daily_summary": """
+        CREATE TABLE IF NOT EXISTS {name} (
+            day INTEGER PRIMARY KEY,     -- północ czasu lokalnego (epoch)
+            entries INTEGER NOT NULL,
+            energy_sum INTEGER NOT NULL,
+            focus_sum INTEGER NOT NULL
+        )
+    """,
+    "session_daily_summary": """
+        CREATE TABLE IF NOT EXISTS {name} (
+            day INTEGER PRIMARY KEY,
+            sessions INTEGER NOT NULL,
+            completed INTEGER NOT NULL,
+            minutes INTEGER NOT NULL
+        )
+    """,
+    # Ostatni numer zmiany (seq) przyjęty od każdej innej kopii
+    "sync_peers": """
+        CREATE TABLE IF NOT EXISTS {name} (
+            peer_id TEXT PRIMARY KEY,
+            last_seq INTEGER NOT NULL
+        )
+    """,
+    # Reguła powtarzania – jedna na zadanie; wystąpienia są rozwijane przy odczycie (data/recurrence.py)
+    "task_recurrence": """
+        CREATE TABLE IF NOT EXISTS {name} (
+            task_id INTEGER PRIMARY KEY,
+            freq TEXT NOT NULL,            -- 'daily', 'weekly' albo 'monthly'
+            interval INTEGER NOT NULL DEFAULT 1,
+            weekdays INTEGER NOT NULL DEFAULT 0,  -- maska dni tygodnia (bit 0 = poniedziałek)
+            start_date INTEGER NOT NULL,   -- pierwsze wystąpienie (północ czasu lokalnego)
+            until_date INTEGER,            -- ostatni możliwy dzień albo NULL
+            FOREIGN KEY (task_id) REFERENCES tasks(id)
+        )
+    """,
+    # Wyjątki pojedynczych wystąpień (wykonane, pominięte, przeniesione) – tylko tam, gdzie są
+    # Wartości dat sprzed migracji 1 -> 2, których nie dało się odczytać – oryginalny tekst
+    "legacy_values": """
+        CREATE TABLE IF NOT EXISTS {name} (
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            column_name TEXT NOT NULL,
+            raw_value TEXT,
+            PRIMARY KEY (table_name, row_id, column_name)
+        )
+    """,
+    "task_occurrence_overrides": """
+        CREATE TABLE IF NOT EXISTS {name} (
+            task_id INTEGER NOT NULL,
+            occurrence_date INTEGER NOT NULL,  -- pierwotna data wystąpienia
+            status TEXT,                       -- np. 'Done' albo 'Skipped'
+            moved_to INTEGER,                  -- nowa data albo NULL
+            PRIMARY KEY (task_id, occurrence_date)
+        ) WITHOUT ROWID
+    """,
+}
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks(due_date)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_modified_at ON tasks(modified_at)",  # get_open_tasks(modified_since)
+    "CREATE INDEX IF NOT EXISTS idx_moods_date ON moods(date)",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_start_time ON pomodoro_sessions(start_time)",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_task_id ON pomodoro_sessions(task_id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_change_log_row ON change_log(table_name, row_uid)",
+] + [f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_uid ON {table}(uid)" for table in SYNCED_TABLES]
+
+_LOG_CHANGE = """
+    DELETE FROM change_log WHERE table_name = '{table}' AND row_uid = {row}.uid;
+    INSERT INTO change_log (table_name, row_uid, op, changed_at, origin)
+    VALUES ('{table}', {row}.uid, '{op}', {now_ms}, (SELECT value FROM sync_meta WHERE key = 'site_id'));
+"""
+_CHANGELOG_ENABLED = "(SELECT value FROM sync_meta WHERE key = 'suppress_changelog') = '0'"
+
+# Wyzwalacze zapisujące każdą zmianę w change_log (poprzedni wpis wiersza jest zastępowany)
+TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()} AFTER {event} ON {table}
+    WHEN {_CHANGELOG_ENABLED}
+    BEGIN
+        {_LOG_CHANGE.format(table=table, row=row, op=op, now_ms=NOW_MS)}
+    END
+    """
+    for table in SYNCED_TABLES
+    for event, row, op in (("INSERT", "NEW", "U"), ("UPDATE", "NEW", "U"), ("DELETE", "OLD", "D"))
+] + [
+    # Klucze obce nie są włączone – regułę i wyjątki usuwamy razem z zadaniem
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_tasks_delete_recurrence AFTER DELETE ON tasks
+    BEGIN
+        DELETE FROM task_recurrence WHERE task_id = OLD.id;
+        DELETE FROM task_occurrence_overrides WHERE task_id = OLD.id;
+    END
+    """
+]
+
+# Zadania z terminem w zakresie dat [:start, :end] oraz zadania powtarzalne,
+# których reguła może mieć wystąpienie w zakresie – jedno zapytanie, wyjątki
+# z zakresu dołączone jako tablica JSON.
+_TASKS_IN_RANGE = f"""
+    WITH bounds (lo, hi) AS (
+        SELECT {LOCAL_TO_EPOCH.format(value=':start')}, {LOCAL_TO_EPOCH.format(value="date(:end, '+1 day')")}
+    )
+    SELECT {TASK_COLUMNS}, {PRIORITY_RANK_SQL.format(column='tasks.priority')} AS priority_rank,
+           NULL AS freq, NULL AS interval, NULL AS weekdays, NULL AS rule_start, NULL AS rule_until,
+           NULL AS overrides
+    FROM tasks, bounds
+    WHERE tasks.due_date >= bounds.lo AND tasks.due_date < bounds.hi
+      AND NOT EXISTS (SELECT 1 FROM task_recurrence r WHERE r.task_id = tasks.id)
+    UNION ALL
+    SELECT {TASK_COLUMNS}, {PRIORITY_RANK_SQL.format(column='tasks.priority')} AS priority_rank,
+           r.freq, r.interval, r.weekdays,
+           {EPOCH_TO_DATE.format(column='r.start_date')} AS rule_start,
+           {EPOCH_TO_DATE.format(column='r.until_date')} AS rule_until,
+           (SELECT json_group_array(json_array(
+                       {EPOCH_TO_DATE.format(column='o.occurrence_date')}, o.status,
+                       {EPOCH_TO_DATE.format(column='o.moved_to')}))
+            FROM task_occurrence_overrides o
+            WHERE o.task_id = r.task_id
+              AND ((o.occurrence_date >= bounds.lo AND o.occurrence_date < bounds.hi)
+                   OR (o.moved_to >= bounds.lo AND o.moved_to < bounds.hi))) AS overrides
+    FROM task_recurrence r JOIN tasks ON tasks.id = r.task_id, bounds
+    WHERE (r.start_date < bounds.hi AND (r.until_date IS NULL OR r.until_date >= bounds.lo))
+       OR EXISTS (SELECT 1 FROM task_occurrence_overrides o
+                  WHERE o.task_id = r.task_id AND o.moved_to >= bounds.lo AND o.moved_to < bounds.hi)
+    ORDER BY priority_rank DESC, due_date
+"""
+
+# Północ (czas lokalny) dnia, w którym wypada :start – dzienne podsumowania mają klucz `day`
+_LOCAL_DAY_START = LOCAL_TO_EPOCH.format(value=EPOCH_TO_DATE.format(column=':start'))
+
 class DatabaseManager:
     """Rozszerzona wersja bazy SQLite z polami pod AI i pomodoro."""
 
-    def __init__(self):
-        self.db_path = "data/adhd_app.db"
+    # Jak długo odczyt czeka na zatwierdzenie zaległych zapisów (np. gdy inny proces blokuje bazę)
+    READ_FLUSH_TIMEOUT = 1.0
+
+    def __init__(self, db_path="data/adhd_app.db", cache_size=0, write_behind=False,
+                 flush_interval=1.0, flush_batch=500):
+        """
+        db_path: ścieżka pliku bazy.
+        cache_size: liczba wyników zapytań trzymanych w cache LRU (0 = bez cache).
+        write_behind: zapisy grupowane w tle w jedną transakcję co flush_interval
+            sekund albo co flush_batch poleceń (patrz WriteBehindQueue).
+        """
+        self.db_path = db_path
+        self.cache = QueryCache(cache_size) if cache_size > 0 else None
         self._create_database()
+        self._write_queue = (
+            WriteBehindQueue(self.db_path, flush_interval, flush_batch) if write_behind else None
+        )
+
+    def _connect(self):
+        """
+        Połączenie do odczytu/zapisu synchronicznego. Najpierw zatwierdza
+        zaległe zapisy z kolejki, żeby odczyt widział własne zmiany.
+        """
+        if self._write_queue is not None and self._write_queue.pending():
+            if not self._write_queue.flush(self.READ_FLUSH_TIMEOUT):
+                logger.warning("Zaległe zapisy jeszcze niezatwierdzone – odczyt bez nich.")
+        return sqlite3.connect(self.db_path)
+
+    def _execute_write(self, sql, params=()):
+        """Zapis bez wyniku – do kolejki (write-behind) albo od razu z commitem."""
+        if self._write_queue is not None:
+            self._write_queue.submit(sql, params)
+            return
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute(sql, params)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _execute_writes(self, statements):
+        """Kilka zapisów (lista (sql, params)) w jednej transakcji, na jednym połączeniu."""
+        if self._write_queue is not None:
+            self._write_queue.submit_many(statements)
+            return
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for sql, params in statements:
+                conn.execute(sql, params)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def flush(self, timeout=None):
+        """Wymusza zatwierdzenie wszystkich zaległych zapisów. False, gdy nie zdążyły w `timeout` s."""
+        if self._write_queue is not None:
+            return self._write_queue.flush(timeout)
+        return True
+
+    def close(self):
+        """Opróżnia kolejkę zapisów i wyłącza tryb write-behind."""
+        if self._write_queue is not None:
+            self._write_queue.close()
+            self._write_queue = None
 
     def _create_database(self):
-        """Tworzy tabele, jeśli jeszcze nie istnieją."""
+        """
+        Tworzy tabele, jeśli jeszcze nie istnieją, i migruje starsze schematy.
+        Całość idzie w jednej transakcji (także DDL); nieudana migracja jest wycofywana
+        i kończy się MigrationError – aplikacja nie działa na schemacie „w połowie”.
+        """
+        conn = sqlite3.connect(self.db_path, isolation_level=None)  # transakcję prowadzimy sami
         try:
-            conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
+            version = cursor.execute("PRAGMA user_version").fetchone()[0]
+            if version == SCHEMA_VERSION:
+                return  # schemat aktualny – bez transakcji zapisu przy starcie
+            if version == 0 and self._table_exists(cursor, "tasks"):
+                version = 1  # baza sprzed wersjonowania schematu
+            if version == 0:
+                # Musi być ustawione przed utworzeniem pierwszej tabeli
+                cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
 
-            # Tabela zadań - dodajmy kilka pól
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS tasks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    description TEXT,
-                    priority TEXT NOT NULL,
-                    status TEXT NOT NULL,
-                    due_date TEXT,
-                    created_at TEXT NOT NULL,
-                    modified_at TEXT NOT NULL,
-                    focus_score REAL,         -- ocena 'skupienia' - placeholder
-                    recommended_session INTEGER -- rekomendowana długość sesji
-                )
-            """)
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                if 0 < version < 2:
+                    self._migrate_to_epoch(cursor)
+                elif version == 2:
+                    self._migrate_add_uids(cursor)
+                if 0 < version < 3:
+                    self._assign_migrated_uids(conn, cursor)
 
-            # Tabela nastrojów - poszerzona
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS moods (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    date TEXT NOT NULL,
-                    mood TEXT NOT NULL,
-                    notes TEXT,
-                    energy_level INTEGER, 
-                    focus_level INTEGER
-                )
-            """)
+                for name, schema in TABLE_SCHEMAS.items():
+                    cursor.execute(schema.format(name=name))
+                for index_sql in INDEXES:
+                    cursor.execute(index_sql)
+                cursor.execute("INSERT OR IGNORE INTO sync_meta VALUES ('site_id', lower(hex(randomblob(8))))")
+                cursor.execute("INSERT OR IGNORE INTO sync_meta VALUES ('suppress_changelog', '0')")
+                for trigger_sql in TRIGGERS:
+                    cursor.execute(trigger_sql)
+                if 0 < version < 3:
+                    self._seed_change_log(cursor)
 
-            # Tabela pomodoro_sessions - do śledzenia sesji
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS pomodoro_sessions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    task_id INTEGER,
-                    start_time TEXT,
-                    end_time TEXT,
-                    planned_duration INTEGER,
-                    actual_duration INTEGER,
-                    completed INTEGER,
-                    FOREIGN KEY (task_id) REFERENCES tasks(id)
-                )
-            """)
+                cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                cursor.execute("COMMIT")
+            except sqlite3.Error as e:
+                cursor.execute("ROLLBACK")
+                logger.error(f"Migracja bazy {self.db_path} z wersji {version} nie powiodła się: {e}")
+                raise MigrationError(
+                    f"Nie udało się zaktualizować bazy {self.db_path} z wersji {version} "
+                    f"do {SCHEMA_VERSION}: {e}. Baza nie została zmieniona."
+                ) from e
 
-            conn.commit()
-            conn.close()
+            try:
+                if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                    # Istniejąca baza: tryb auto_vacuum zmienia dopiero pełny VACUUM (jednorazowo)
+                    logger.info("Włączanie auto_vacuum = INCREMENTAL (VACUUM).")
+                    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                    cursor.execute("VACUUM")
+            except sqlite3.Error as e:
+                logger.error(f"Błąd włączania auto_vacuum: {e}")
             logger.info("Baza danych zainicjalizowana (rozszerzona).")
-        except sqlite3.Error as e:
-            logger.error(f"Błąd podczas inicjalizacji bazy: {e}")
+        finally:
+            conn.close()
+
+    def _invalidate(self, table, key=None):
+        if self.cache is not None:
+            self.cache.invalidate(table, key)
+
+    def cache_stats(self):
+        """Liczniki trafień/chybień cache (None, gdy cache wyłączony)."""
+        return self.cache.stats() if self.cache is not None else None
+
+    def _table_exists(self, cursor, table):
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        return cursor.fetchone() is not None
+
+    def _ensure_columns(self, cursor, table, columns):
+        """Dodaje brakujące kolumny do istniejącej tabeli."""
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cursor.fetchall()}
+        for name, col_type in columns.items():
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}")
+
+    def _rebuild_table(self, cursor, table, columns, select_sql):
+        """
+        Przebudowuje tabelę według TABLE_SCHEMAS, kopiując dane zapytaniem select_sql
+        do kolumn `columns`; pozostałe kolumny dostają wartości domyślne.
+        """
+        new_name = f"{table}_new"
+        cursor.execute(f"DROP TABLE IF EXISTS {new_name}")
+        cursor.execute(TABLE_SCHEMAS[table].format(name=new_name))
+        cursor.execute(f"INSERT INTO {new_name} ({columns}) {select_sql}")
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.execute(f"ALTER TABLE {new_name} RENAME TO {table}")
+
+    def _migrate_to_epoch(self, cursor):
+        """Migracja 1 -> 2: daty w formacie TEXT zamieniane na INTEGER (epoch)."""
+        logger.info("Migracja bazy: znaczniki czasu TEXT -> INTEGER.")
+        # Bazy sprzed checkpointów sesji nie mają tych kolumn
+        self._ensure_columns(cursor, "pomodoro_sessions", {
+            "elapsed_seconds": "INTEGER",
+            "paused": "INTEGER",
+            "checkpoint_time": "TEXT",
+        })
+
+        self._normalize_legacy_dates(cursor)
+
+        def to_epoch(column):
+            return LOCAL_TO_EPOCH.format(value=column)
+
+        self._rebuild_table(cursor, "tasks", TASK_BASE_COLUMNS, f"""
+            SELECT id, title, description, priority, status, {to_epoch('due_date')},
+                   {to_epoch('created_at')}, {to_epoch('modified_at')},
+                   focus_score, recommended_session
+            FROM tasks
+        """)
+        self._rebuild_table(cursor, "moods", MOOD_BASE_COLUMNS, f"""
+            SELECT id, {to_epoch('date')}, mood, notes, energy_level, focus_level
+            FROM moods
+        """)
+        self._rebuild_table(cursor, "pomodoro_sessions", SESSION_BASE_COLUMNS, f"""
+            SELECT id, task_id, {to_epoch('start_time')}, {to_epoch('end_time')},
+                   planned_duration, actual_duration, completed,
+                   elapsed_seconds, paused, {to_epoch('checkpoint_time')}
+            FROM pomodoro_sessions
+        """)
+
+    def _normalize_legacy_dates(self, cursor):
+        """
+        Daty wpisane ręcznie w innym formacie (np. "5.01.2025") są zamieniane na ISO.
+        Nieczytelne trafiają w oryginale do legacy_values; kolumna dostaje NULL,
+        a kolumny NOT NULL – chwilę migracji. Każda zmiana jest logowana.
+        """
+        cursor.execute(TABLE_SCHEMAS["legacy_values"].format(name="legacy_values"))
+        for table, columns in LEGACY_DATE_COLUMNS.items():
+            for column, not_null in columns.items():
+                rows = cursor.execute(f"SELECT id, {column} FROM {table} WHERE {column} IS NOT NULL").fetchall()
+                for row_id, value in rows:
+                    text = str(value)
+                    if _ISO_DATETIME.fullmatch(text.strip()):
+                        continue
+                    if not text.strip() and not not_null:
+                        new_value = None  # pusty termin = brak terminu
+                    else:
+                        new_value = _normalize_legacy_date(text)
+                        if new_value is not None:
+                            logger.info(f"Migracja: {table}.{column} (id {row_id}) {text!r} -> {new_value!r}")
+                        else:
+                            cursor.execute(
+                                "INSERT OR REPLACE INTO legacy_values VALUES (?, ?, ?, ?)",
+                                (table, row_id, column, text),
+                            )
+                            if not_null:
+                                new_value = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                            logger.warning(
+                                f"Migracja: {table}.{column} (id {row_id}) – nieczytelna data {text!r}, "
+                                f"zapisano {new_value!r}; oryginał w tabeli legacy_values."
+                            )
+                    cursor.execute(f"UPDATE {table} SET {column} = ? WHERE id = ?", (new_value, row_id))
+
+    def _migrate_add_uids(self, cursor):
+        """Migracja 2 -> 3: kolumna uid (z losową wartością domyślną) w tabelach synchronizowanych."""
+        logger.info("Migracja bazy: identyfikatory wierszy do synchronizacji.")
+        for table, columns in (
+            ("tasks", TASK_BASE_COLUMNS),
+            ("moods", MOOD_BASE_COLUMNS),
+            ("pomodoro_sessions", SESSION_BASE_COLUMNS),
+        ):
+            self._rebuild_table(cursor, table, columns, f"SELECT {columns} FROM {table}")
+
+    def _assign_migrated_uids(self, conn, cursor):
+        """
+        Istniejące wiersze dostają uid wyliczony z ich danych, a nie losowy – kopie
+        tej samej bazy migrowane osobno nie zdublują wierszy przy pierwszej synchronizacji.
+        """
+        conn.create_function("row_uid", -1, _row_uid, deterministic=True)
+        for table, columns in MIGRATED_UID_COLUMNS.items():
+            cursor.execute(f"UPDATE {table} SET uid = row_uid('{table}', {columns})")
+
+    def _seed_change_log(self, cursor):
+        """
+        Istniejące wiersze trafiają do dziennika, żeby pierwsza synchronizacja je objęła.
+        Czas zmiany to czas z wiersza (np. modified_at), a nie chwila migracji – przy
+        osobno migrowanych kopiach wygrywa wersja faktycznie zmieniona później.
+        """
+        for table in SYNCED_TABLES:
+            cursor.execute(f"""
+                INSERT OR IGNORE INTO change_log (table_name, row_uid, op, changed_at, origin)
+                SELECT '{table}', uid, 'U', COALESCE({MIGRATED_CHANGED_AT[table]} * 1000, {NOW_MS}),
+                       (SELECT value FROM sync_meta WHERE key = 'site_id')
+                FROM {table}
+            """)
 
     # ----- Zadania -----
+    @cached("tasks")
     def get_tasks(self):
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
 
-            cursor.execute("""
-                SELECT * FROM tasks 
-                ORDER BY due_date IS NULL, due_date ASC, created_at DESC
+            cursor.execute(f"""
+                SELECT {TASK_COLUMNS} FROM tasks
+                ORDER BY tasks.due_date IS NULL, tasks.due_date ASC, tasks.created_at DESC
             """)
             rows = cursor.fetchall()
             tasks = [dict(row) for row in rows]
@@ -86,94 +612,309 @@ class DatabaseManager:
             logger.error(f"Błąd pobierania zadań: {e}")
             return []
 
-    def add_task(self, title, description, priority, status, due_date="", focus_score=0.0):
+    def add_task(self, title, description, priority, status, due_date="", focus_score=0.0,
+                 recurrence=None):
+        """
+        recurrence: opcjonalna reguła powtarzania, np. {"freq": "weekly", "interval": 1,
+        "weekdays": 0b0011111, "until": "2025-12-31"} – pierwszym wystąpieniem jest due_date
+        (albo dzisiejszy dzień, gdy termin jest pusty).
+        Termin inny niż YYYY-MM-DD (albo pusty) -> ValueError, zanim cokolwiek zostanie zapisane.
+        """
+        due_date = validate_date(due_date, allow_empty=True)
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            cursor.execute("""
-                INSERT INTO tasks 
+            statements = [(f"""
+                INSERT INTO tasks
                 (title, description, priority, status, due_date, created_at, modified_at, focus_score)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (title, description, priority, status, due_date, now, now, focus_score))
-
-            conn.commit()
-            conn.close()
+                VALUES (?, ?, ?, ?, {LOCAL_TO_EPOCH.format(value='?')}, {NOW_EPOCH}, {NOW_EPOCH}, ?)
+            """, (title, description, priority, status, due_date, focus_score))]
+            if recurrence:
+                # To samo połączenie i paczka – last_insert_rowid() to id nowego zadania
+                statements.append(self._recurrence_statement("last_insert_rowid()", (), recurrence))
+            self._execute_writes(statements)
+            # Wystąpienia reguły padają na wiele dni – unieważniamy całą tabelę
+            self._invalidate("tasks", None if recurrence else due_date)
         except sqlite3.Error as e:
             logger.error(f"Błąd dodawania zadania: {e}")
 
     def update_task(self, task_id, title, description, priority, status, due_date="", focus_score=0.0):
+        """Pusty due_date usuwa termin; inny format niż YYYY-MM-DD -> ValueError."""
+        due_date = validate_date(due_date, allow_empty=True)
+        try:
+            self._execute_writes([
+                # Nowy termin zadania powtarzalnego to nowy początek reguły; bez zmiany terminu
+                # (albo przy pustym) start_date zostaje, więc wystąpienia się nie przesuwają
+                (f"""
+                    UPDATE task_recurrence SET start_date = {LOCAL_TO_EPOCH.format(value='?')}
+                    WHERE task_id = ? AND {LOCAL_TO_EPOCH.format(value='?')} IS NOT NULL
+                      AND {LOCAL_TO_EPOCH.format(value='?')} IS NOT (SELECT due_date FROM tasks WHERE id = ?)
+                """, (due_date, task_id, due_date, due_date, task_id)),
+                (f"""
+                    UPDATE tasks
+                    SET title = ?, description = ?, priority = ?, status = ?,
+                        due_date = {LOCAL_TO_EPOCH.format(value='?')},
+                        modified_at = {NOW_EPOCH}, focus_score = ?
+                    WHERE id = ?
+                """, (title, description, priority, status, due_date, focus_score, task_id)),
+            ])
+            # Poprzedni termin nie jest znany – unieważniamy całą tabelę
+            self._invalidate("tasks")
+        except sqlite3.Error as e:
+            logger.error(f"Błąd aktualizacji zadania: {e}")
+
+    def delete_task(self, task_id):
+        try:
+            self._execute_write("DELETE FROM tasks WHERE id = ?", (task_id,))
+            self._invalidate("tasks")
+        except sqlite3.Error as e:
+            logger.error(f"Błąd usuwania zadania: {e}")
+
+    @cached("tasks", key_param="date_str")
+    def get_task_by_date(self, date_str):
+        """Zwraca zadania z terminem w dniu date_str (YYYY-MM-DD), także wystąpienia zadań powtarzalnych."""
+        try:
+            return self._tasks_between(date_str, date_str)
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"Błąd pobierania zadań po dacie: {e}")
+            return []
+
+    @cached("tasks")
+    def get_tasks_between(self, start_date, end_date):
+        """
+        Zadania z terminem w zakresie dat [start_date, end_date] (YYYY-MM-DD, obie granice włącznie).
+        Zadanie powtarzalne występuje raz na każde wystąpienie w zakresie: due_date to data
+        wystąpienia, occurrence_date – jego pierwotna data (inna, gdy wystąpienie przeniesiono),
+        a status uwzględnia wyjątek (np. Done). Pominięte wystąpienia nie są zwracane.
+        """
+        try:
+            return self._tasks_between(start_date, end_date)
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"Błąd pobierania zadań z zakresu: {e}")
+            return []
+
+    def _tasks_between(self, start_date, end_date):
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = conn.execute(_TASKS_IN_RANGE, {"start": start_date, "end": end_date}).fetchall()
+        finally:
+            conn.close()
+
+        tasks = []
+        range_start = range_end = None
+        for row in rows:
+            task = dict(row)
+            del task["priority_rank"]
+            freq = task.pop("freq")
+            rule = {
+                "freq": freq,
+                "interval": task.pop("interval"),
+                "weekdays": task.pop("weekdays"),
+                "start": task.pop("rule_start"),
+                "until": task.pop("rule_until"),
+            }
+            overrides = task.pop("overrides")
+            task["recurring"] = freq is not None
+            if freq is None:
+                task["occurrence_date"] = task["due_date"]
+                tasks.append(task)
+                continue
+
+            if range_start is None:
+                range_start, range_end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+            rule["start"] = date.fromisoformat(rule["start"])
+            rule["until"] = date.fromisoformat(rule["until"]) if rule["until"] else None
+            exceptions = [
+                (date.fromisoformat(original), status, date.fromisoformat(moved_to) if moved_to else None)
+                for original, status, moved_to in json.loads(overrides)
+            ]
+            for day, original, status in occurrences(rule, range_start, range_end, exceptions):
+                occurrence = dict(task)
+                occurrence["due_date"] = day.isoformat()
+                occurrence["occurrence_date"] = original.isoformat()
+                if status:
+                    occurrence["status"] = status
+                tasks.append(occurrence)
+
+        # Stabilne sortowanie – w obrębie dnia zostaje kolejność z zapytania
+        tasks.sort(key=lambda task: task["due_date"])
+        return tasks
+
+    def get_open_tasks(self, date_str, task_ids=None, modified_since=None):
+        """
+        Zadania do zaplanowania na dzień date_str: niezakończone zadania jednorazowe
+        (z terminem albo bez) i niezakończone wystąpienia zadań powtarzalnych z tego dnia.
+        task_ids: tylko te zadania; modified_since: tylko zmienione od tej chwili (epoch).
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conditions, params = ["tasks.status != 'Done'"], []
+            if task_ids is not None:
+                conditions.append(f"tasks.id IN ({', '.join('?' * len(task_ids))})")
+                params.extend(task_ids)
+            if modified_since is not None:
+                conditions.append("tasks.modified_at >= ?")
+                params.append(int(modified_since))
+
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
 
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            cursor.execute("""
-                UPDATE tasks
-                SET title = ?, description = ?, priority = ?, status = ?, due_date = ?, 
-                    modified_at = ?, focus_score = ?
-                WHERE id = ?
-            """, (title, description, priority, status, due_date, now, focus_score, task_id))
+            cursor.execute(f"""
+                SELECT {TASK_COLUMNS} FROM tasks
+                WHERE {' AND '.join(conditions)}
+                  AND NOT EXISTS (SELECT 1 FROM task_recurrence r WHERE r.task_id = tasks.id)
+            """, params)
+            tasks = [dict(row, recurring=False, occurrence_date=row["due_date"]) for row in cursor.fetchall()]
 
-            conn.commit()
+            # Zadania powtarzalne spełniające te same warunki – z nich bierzemy wystąpienia z dnia
+            cursor.execute(f"""
+                SELECT tasks.id FROM tasks JOIN task_recurrence r ON r.task_id = tasks.id
+                WHERE {' AND '.join(conditions)}
+            """, params)
+            recurring_ids = {row[0] for row in cursor.fetchall()}
             conn.close()
+
+            if recurring_ids:
+                tasks.extend(
+                    task for task in self.get_task_by_date(date_str)
+                    if task["recurring"] and task["id"] in recurring_ids and task["status"] != "Done"
+                )
+            return tasks
         except sqlite3.Error as e:
-            logger.error(f"Błąd aktualizacji zadania: {e}")
+            logger.error(f"Błąd pobierania otwartych zadań: {e}")
+            return []
 
-    def delete_task(self, task_id):
+    def _recurrence_statement(self, task_id_sql, task_id_params, recurrence):
+        """
+        UPSERT reguły powtarzania. Nowa reguła zaczyna się w terminie zadania albo dziś;
+        zmiana istniejącej nie rusza start_date – dni wystąpień się nie przesuwają
+        (start przestawia tylko zmiana terminu w update_task).
+        """
+        until = validate_date(recurrence.get("until"), allow_empty=True)
+        return (f"""
+            INSERT INTO task_recurrence
+            (task_id, freq, interval, weekdays, start_date, until_date)
+            SELECT id, ?, ?, ?,
+                   COALESCE(due_date, {LOCAL_TO_EPOCH.format(value="date('now', 'localtime')")}),
+                   {LOCAL_TO_EPOCH.format(value='?')}
+            FROM tasks WHERE id = {task_id_sql}
+            ON CONFLICT(task_id) DO UPDATE SET
+                freq = excluded.freq, interval = excluded.interval,
+                weekdays = excluded.weekdays, until_date = excluded.until_date
+        """, (
+            recurrence["freq"],
+            int(recurrence.get("interval") or 1),
+            int(recurrence.get("weekdays") or 0),
+            until,
+        ) + tuple(task_id_params))
+
+    def get_task_recurrence(self, task_id):
+        """Reguła powtarzania zadania (freq, interval, weekdays, start, until) albo None."""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-            conn.commit()
+
+            cursor.execute(f"""
+                SELECT freq, interval, weekdays,
+                       {EPOCH_TO_DATE.format(column='start_date')} AS start,
+                       {EPOCH_TO_DATE.format(column='until_date')} AS until
+                FROM task_recurrence WHERE task_id = ?
+            """, (task_id,))
+            row = cursor.fetchone()
+
             conn.close()
+            return dict(row) if row else None
         except sqlite3.Error as e:
-            logger.error(f"Błąd usuwania zadania: {e}")
+            logger.error(f"Błąd pobierania reguły powtarzania: {e}")
+            return None
 
-    def get_task_by_date(self, date_str):
-        """Zwraca zadania z due_date = date_str."""
+    def set_task_recurrence(self, task_id, recurrence):
+        """
+        Ustawia regułę powtarzania istniejącego zadania; None usuwa regułę i jej wyjątki.
+        Początek istniejącej reguły (start_date) zostaje bez zmian.
+        """
+        try:
+            if recurrence:
+                self._execute_writes([self._recurrence_statement("?", (task_id,), recurrence)])
+            else:
+                self._execute_writes([
+                    ("DELETE FROM task_recurrence WHERE task_id = ?", (task_id,)),
+                    ("DELETE FROM task_occurrence_overrides WHERE task_id = ?", (task_id,)),
+                ])
+            self._invalidate("tasks")
+        except sqlite3.Error as e:
+            logger.error(f"Błąd zapisu reguły powtarzania: {e}")
+
+    def set_occurrence_override(self, task_id, occurrence_date, status=None, moved_to=None):
+        """
+        Wyjątek dla jednego wystąpienia zadania powtarzalnego (daty YYYY-MM-DD):
+        status (np. "Done", "Skipped") i/lub przeniesienie na moved_to.
+        Bez statusu i przeniesienia wyjątek jest usuwany.
+        """
+        occurrence_date = validate_date(occurrence_date)
+        moved_to = validate_date(moved_to, allow_empty=True)
         try:
-            conn = sqlite3.connect(self.db_path)
+            if status is None and not moved_to:
+                self._execute_write(f"""
+                    DELETE FROM task_occurrence_overrides
+                    WHERE task_id = ? AND occurrence_date = {LOCAL_TO_EPOCH.format(value='?')}
+                """, (task_id, occurrence_date))
+            else:
+                self._execute_write(f"""
+                    INSERT OR REPLACE INTO task_occurrence_overrides
+                    (task_id, occurrence_date, status, moved_to)
+                    VALUES (?, {LOCAL_TO_EPOCH.format(value='?')}, ?, {LOCAL_TO_EPOCH.format(value='?')})
+                """, (task_id, occurrence_date, status, moved_to or ""))
+            self._invalidate("tasks")
+        except sqlite3.Error as e:
+            logger.error(f"Błąd zapisu wyjątku wystąpienia: {e}")
+
+    @cached("tasks")
+    def get_task_titles(self, exclude_status="Done", limit=50, search=""):
+        """
+        Lekka projekcja (id, title) dla list wyboru – bez opisów i dat.
+        search: fragment tytułu (filtr LIKE), limit: maksymalna liczba wyników.
+        """
+        try:
+            conn = self._connect()
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
 
             cursor.execute("""
-                SELECT * FROM tasks
-                WHERE due_date = ?
-                ORDER BY priority DESC
-            """, (date_str,))
+                SELECT id, title FROM tasks
+                WHERE status != ? AND title LIKE ?
+                ORDER BY due_date IS NULL, due_date ASC, id DESC
+                LIMIT ?
+            """, (exclude_status, f"%{search}%", limit))
             tasks = [dict(row) for row in cursor.fetchall()]
 
             conn.close()
             return tasks
         except sqlite3.Error as e:
-            logger.error(f"Błąd pobierania zadań po dacie: {e}")
+            logger.error(f"Błąd pobierania tytułów zadań: {e}")
             return []
 
     # ----- Moods -----
     def add_mood(self, date_str, mood, notes="", energy_level=5, focus_level=5):
+        """date_str: YYYY-MM-DD; inny format -> ValueError (nic nie jest zapisywane)."""
+        date_str = validate_date(date_str)
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute("""
+            self._execute_write(f"""
                 INSERT INTO moods (date, mood, notes, energy_level, focus_level)
-                VALUES (?, ?, ?, ?, ?)
+                VALUES ({LOCAL_TO_EPOCH.format(value='?')}, ?, ?, ?, ?)
             """, (date_str, mood, notes, energy_level, focus_level))
-
-            conn.commit()
-            conn.close()
+            self._invalidate("moods", date_str)
         except sqlite3.Error as e:
             logger.error(f"Błąd dodawania nastroju: {e}")
 
+    @cached("moods")
     def get_moods(self):
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
 
-            cursor.execute("SELECT * FROM moods ORDER BY id DESC")
+            cursor.execute(f"SELECT {MOOD_COLUMNS} FROM moods ORDER BY moods.id DESC")
             rows = cursor.fetchall()
             moods = [dict(row) for row in rows]
 
@@ -183,13 +924,36 @@ class DatabaseManager:
             logger.error(f"Błąd pobierania nastrojów: {e}")
             return []
 
+    @cached("moods")
+    def get_latest_mood(self):
+        """Zwraca najnowszy wpis nastroju albo None."""
+        try:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+
+            cursor.execute(f"SELECT {MOOD_COLUMNS} FROM moods ORDER BY moods.id DESC LIMIT 1")
+            row = cursor.fetchone()
+
+            conn.close()
+            return dict(row) if row else None
+        except sqlite3.Error as e:
+            logger.error(f"Błąd pobierania ostatniego nastroju: {e}")
+            return None
+
+    @cached("moods", key_param="date_str")
     def get_mood_by_date(self, date_str):
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
 
-            cursor.execute("SELECT * FROM moods WHERE date = ?", (date_str,))
+            cursor.execute(f"""
+                SELECT {MOOD_COLUMNS} FROM moods
+                WHERE moods.date >= {LOCAL_TO_EPOCH.format(value='?')}
+                  AND moods.date < {LOCAL_TO_EPOCH.format(value="date(?, '+1 day')")}
+                ORDER BY moods.id
+            """, (date_str, date_str))
             rows = cursor.fetchall()
             moods = [dict(row) for row in rows]
 
@@ -199,20 +963,39 @@ class DatabaseManager:
             logger.error(f"Błąd pobierania nastroju po dacie: {e}")
             return []
 
+    @cached("moods")
+    def get_moods_between(self, start_ts, end_ts):
+        """Nastroje z zakresu [start_ts, end_ts) – granice jako epoch w sekundach."""
+        try:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+
+            cursor.execute(f"""
+                SELECT {MOOD_COLUMNS} FROM moods
+                WHERE moods.date >= ? AND moods.date < ?
+                ORDER BY moods.date, moods.id
+            """, (int(start_ts), int(end_ts)))
+            moods = [dict(row) for row in cursor.fetchall()]
+
+            conn.close()
+            return moods
+        except sqlite3.Error as e:
+            logger.error(f"Błąd pobierania nastrojów z zakresu: {e}")
+            return []
+
     # ----- Pomodoro Sessions -----
     def add_pomodoro_session(self, task_id, planned_duration):
         """Start nową sesję pomodoro (bez end_time, bo jeszcze nie wiemy)."""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
 
-            start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            cursor.execute("""
-                INSERT INTO pomodoro_sessions 
-                (task_id, start_time, planned_duration, completed) 
-                VALUES (?, ?, ?, 0)
-            """, (task_id, start_time, planned_duration))
+            cursor.execute(f"""
+                INSERT INTO pomodoro_sessions
+                (task_id, start_time, planned_duration, completed)
+                VALUES (?, {NOW_EPOCH}, ?, 0)
+            """, (task_id, planned_duration))
 
             conn.commit()
             session_id = cursor.lastrowid
@@ -222,38 +1005,203 @@ class DatabaseManager:
             logger.error(f"Błąd dodawania pomodoro sesji: {e}")
             return None
 
-    def end_pomodoro_session(self, session_id):
-        """Zakończ trwającą sesję pomodoro."""
+    def end_pomodoro_session(self, session_id, actual_minutes=None, completed=True):
+        """
+        Zakończ trwającą sesję pomodoro.
+        actual_minutes: faktycznie odliczony czas (bez pauz) z timera;
+        gdy brak – liczony w SQL z różnicy end_time - start_time.
+        Zapis synchroniczny (także w trybie write-behind), bo wynik zależy od tego,
+        czy sesja istnieje.
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
 
-            end_time = datetime.now()
-            end_str = end_time.strftime("%Y-%m-%d %H:%M:%S")
-
-            # Pobierz poprzedni start
-            cursor.execute("""
-                SELECT start_time FROM pomodoro_sessions WHERE id = ?
-            """, (session_id,))
-            row = cursor.fetchone()
-
-            if not row:
-                conn.close()
-                return False
-
-            start_dt = datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S")
-            duration = int((end_time - start_dt).total_seconds() // 60)
-
-            cursor.execute("""
+            cursor.execute(f"""
                 UPDATE pomodoro_sessions
-                SET end_time = ?, actual_duration = ?, completed = 1
+                SET end_time = {NOW_EPOCH},
+                    actual_duration = COALESCE(?, ({NOW_EPOCH} - start_time) / 60),
+                    completed = ?, paused = 0
                 WHERE id = ?
-            """, (end_str, duration, session_id))
+            """, (actual_minutes, int(completed), session_id))
+            updated = cursor.rowcount > 0
 
             conn.commit()
             conn.close()
-            return True
+            return updated
 
         except sqlite3.Error as e:
             logger.error(f"Błąd kończenia sesji pomodoro: {e}")
             return False
+
+    def checkpoint_pomodoro_session(self, session_id, elapsed_seconds, paused=False):
+        """Zapisuje stan trwającej sesji, żeby po awarii/restarcie ją wznowić."""
+        try:
+            self._execute_write(f"""
+                UPDATE pomodoro_sessions
+                SET elapsed_seconds = ?, paused = ?, checkpoint_time = {NOW_EPOCH}
+                WHERE id = ? AND end_time IS NULL
+            """, (int(elapsed_seconds), int(paused), session_id))
+        except sqlite3.Error as e:
+            logger.error(f"Błąd zapisu checkpointu sesji pomodoro: {e}")
+
+    def get_active_pomodoro_session(self):
+        """Zwraca ostatnią niezakończoną sesję (np. przerwaną przez awarię) albo None."""
+        try:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+
+            cursor.execute(f"""
+                SELECT {SESSION_COLUMNS} FROM pomodoro_sessions
+                WHERE pomodoro_sessions.end_time IS NULL
+                ORDER BY pomodoro_sessions.id DESC
+                LIMIT 1
+            """)
+            row = cursor.fetchone()
+
+            conn.close()
+            return dict(row) if row else None
+        except sqlite3.Error as e:
+            logger.error(f"Błąd pobierania aktywnej sesji pomodoro: {e}")
+            return None
+
+    def get_sessions_between(self, start_ts, end_ts):
+        """Sesje rozpoczęte w zakresie [start_ts, end_ts) – granice jako epoch w sekundach."""
+        try:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+
+            cursor.execute(f"""
+                SELECT {SESSION_COLUMNS} FROM pomodoro_sessions
+                WHERE pomodoro_sessions.start_time >= ? AND pomodoro_sessions.start_time < ?
+                ORDER BY pomodoro_sessions.start_time
+            """, (int(start_ts), int(end_ts)))
+            sessions = [dict(row) for row in cursor.fetchall()]
+
+            conn.close()
+            return sessions
+        except sqlite3.Error as e:
+            logger.error(f"Błąd pobierania sesji z zakresu: {e}")
+            return []
+
+    def get_recent_sessions(self, limit=3, task_id=None):
+        """Ostatnie zakończone sesje (np. do korekty rekomendacji PomodoroAI)."""
+        try:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+
+            cursor.execute(f"""
+                SELECT {SESSION_COLUMNS} FROM pomodoro_sessions
+                WHERE pomodoro_sessions.end_time IS NOT NULL
+                  AND (? IS NULL OR pomodoro_sessions.task_id = ?)
+                ORDER BY pomodoro_sessions.id DESC
+                LIMIT ?
+            """, (task_id, task_id, limit))
+            sessions = [dict(row) for row in cursor.fetchall()]
+
+            conn.close()
+            return sessions
+        except sqlite3.Error as e:
+            logger.error(f"Błąd pobierania ostatnich sesji: {e}")
+            return []
+
+    def get_session_summary(self, start_ts, end_ts):
+        """
+        Podsumowanie sesji per dzień z zakresu [start_ts, end_ts) – agregacja w SQL.
+        Dni, których sesje przeniesiono już do archiwum, pochodzą z session_daily_summary.
+        """
+        try:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+
+            cursor.execute(f"""
+                SELECT day, SUM(sessions) AS sessions, SUM(completed) AS completed, SUM(minutes) AS minutes
+                FROM (
+                    SELECT {EPOCH_TO_DATE.format(column='start_time')} AS day,
+                           COUNT(*) AS sessions,
+                           COALESCE(SUM(completed), 0) AS completed,
+                           COALESCE(SUM(actual_duration), 0) AS minutes
+                    FROM pomodoro_sessions
+                    WHERE start_time >= :start AND start_time < :end
+                    GROUP BY day
+                    UNION ALL
+                    SELECT {EPOCH_TO_DATE.format(column='day')}, sessions, completed, minutes
+                    FROM session_daily_summary
+                    WHERE day >= {_LOCAL_DAY_START} AND day < :end
+                )
+                GROUP BY day
+                ORDER BY day
+            """, {"start": int(start_ts), "end": int(end_ts)})
+            summary = [dict(row) for row in cursor.fetchall()]
+
+            conn.close()
+            return summary
+        except sqlite3.Error as e:
+            logger.error(f"Błąd podsumowania sesji: {e}")
+            return []
+
+    def get_mood_summary(self, start_ts, end_ts):
+        """
+        Nastroje per dzień z zakresu [start_ts, end_ts): liczba wpisów i średnia energia/skupienie.
+        Dni przeniesione do archiwum pochodzą z mood_daily_summary.
+        """
+        try:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+
+            cursor.execute(f"""
+                SELECT {EPOCH_TO_DATE.format(column='day')} AS day, SUM(entries) AS entries,
+                       ROUND(1.0 * SUM(energy_sum) / SUM(entries), 1) AS energy_level,
+                       ROUND(1.0 * SUM(focus_sum) / SUM(entries), 1) AS focus_level
+                FROM (
+                    SELECT date AS day, COUNT(*) AS entries,
+                           COALESCE(SUM(energy_level), 0) AS energy_sum,
+                           COALESCE(SUM(focus_level), 0) AS focus_sum
+                    FROM moods
+                    WHERE date >= {_LOCAL_DAY_START} AND date < :end
+                    GROUP BY date
+                    UNION ALL
+                    SELECT day, entries, energy_sum, focus_sum
+                    FROM mood_daily_summary
+                    WHERE day >= {_LOCAL_DAY_START} AND day < :end
+                )
+                GROUP BY day
+                ORDER BY day
+            """, {"start": int(start_ts), "end": int(end_ts)})
+            summary = [dict(row) for row in cursor.fetchall()]
+
+            conn.close()
+            return summary
+        except sqlite3.Error as e:
+            logger.error(f"Błąd podsumowania nastrojów: {e}")
+            return []
+
+    # ----- Konserwacja -----
+    def integrity_check(self, quick=False):
+        """Zwraca listę komunikatów PRAGMA integrity_check (["ok"], gdy baza jest spójna)."""
+        try:
+            conn = self._connect()
+            pragma = "quick_check" if quick else "integrity_check"
+            messages = [row[0] for row in conn.execute(f"PRAGMA {pragma}")]
+            conn.close()
+            return messages
+        except sqlite3.Error as e:
+            logger.error(f"Błąd sprawdzania spójności bazy: {e}")
+            return [str(e)]
+
+    def vacuum(self):
+        """Przepisuje plik bazy, odzyskując wolne strony. Zwraca (rozmiar przed, po) w bajtach."""
+        try:
+            before = os.path.getsize(self.db_path)
+            conn = self._connect()
+            conn.execute("VACUUM")
+            conn.close()
+            return before, os.path.getsize(self.db_path)
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"Błąd VACUUM: {e}")
+            return None
@@ -0,0 +1,209 @@
+import sqlite3
+import logging
+import threading
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_MINUTE = 60
+ROLLUP_HOUR = 3600
+
+# Schematy tabel ({name} – nazwa, także z prefiksem bazy, np. archive.emotion_blocks)
+TABLE_SCHEMAS = {
+    "emotion_blocks": """
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY,
+            source TEXT NOT NULL,
+            minute INTEGER NOT NULL,      -- epoch // 60
+            n_samples INTEGER NOT NULL,
+            n_classes INTEGER NOT NULL,
+            offsets BLOB NOT NULL,        -- uint8: sekunda w minucie
+            probs BLOB NOT NULL           -- uint8[n_samples, n_classes]
+        )
+    """,
+    "emotion_rollups": """
+        CREATE TABLE IF NOT EXISTS {name} (
+            source TEXT NOT NULL,
+            resolution INTEGER NOT NULL,  -- 60 (minuta) albo 3600 (godzina)
+            bucket INTEGER NOT NULL,      -- początek przedziału (epoch)
+            count INTEGER NOT NULL,
+            sums BLOB NOT NULL,           -- float32[n_classes]
+            PRIMARY KEY (source, resolution, bucket)
+        ) WITHOUT ROWID
+    """,
+}
+
+class EmotionTimeSeries:
+    """
+    Magazyn ciągłych odczytów emocji (wektory prawdopodobieństw klas).
+
+    Odczyty nie są zapisywane jako osobne wiersze. Dla każdego źródła
+    (np. "video", "audio") zbieramy w pamięci próbki bieżącej minuty,
+    a po jej upływie zapisujemy jeden blok: przesunięcia sekund (uint8)
+    i prawdopodobieństwa skwantowane do uint8 (0-255) jako BLOB-y.
+    Bloki są tylko dopisywane; przy każdym zapisie aktualizowane są
+    agregaty minutowe i godzinowe (sumy prawdopodobieństw + liczba próbek).
+
+    Niezapisana bieżąca minuta żyje tylko w pamięci – przy awarii można
+    stracić do 60 s odczytów; `flush()` zapisuje ją od razu.
+    """
+
+    def __init__(self, db_path="data/adhd_app.db"):
+        self.db_path = db_path
+        self._buffers = {}  # źródło -> {"minute": int, "offsets": [...], "rows": [...]}
+        self._lock = threading.Lock()
+        self._create_tables()
+
+    def _create_tables(self):
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            for name, schema in TABLE_SCHEMAS.items():
+                cursor.execute(schema.format(name=name))
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_emotion_blocks_source_minute
+                ON emotion_blocks(source, minute)
+            """)
+
+            conn.commit()
+            conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Błąd tworzenia tabel szeregów emocji: {e}")
+
+    # ----- Zapis -----
+    def append(self, source, probs, timestamp=None):
+        """Dodaje jeden odczyt (wektor prawdopodobieństw) ze źródła `source`."""
+        timestamp = time.time() if timestamp is None else timestamp
+        second = int(timestamp)
+        minute = second // 60
+        row = np.clip(np.rint(np.asarray(probs, dtype=np.float32) * 255), 0, 255).astype(np.uint8)
+
+        with self._lock:
+            buffer = self._buffers.get(source)
+            if buffer is not None and (buffer["minute"] != minute or buffer["rows"][0].size != row.size):
+                self._write_blocks([(source, self._buffers.pop(source))])
+                buffer = None
+            if buffer is None:
+                buffer = {"minute": minute, "offsets": [], "rows": []}
+                self._buffers[source] = buffer
+            buffer["offsets"].append(second - minute * 60)
+            buffer["rows"].append(row)
+
+    def flush(self):
+        """Zapisuje wszystkie niepełne minuty z pamięci."""
+        with self._lock:
+            blocks = list(self._buffers.items())
+            self._buffers.clear()
+            if blocks:
+                self._write_blocks(blocks)
+
+    def _write_blocks(self, blocks):
+        """Dopisuje bloki i aktualizuje agregaty w jednej transakcji."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            with conn:
+                for source, buffer in blocks:
+                    rows = np.vstack(buffer["rows"])
+                    offsets = np.asarray(buffer["offsets"], dtype=np.uint8)
+                    conn.execute("""
+                        INSERT INTO emotion_blocks (source, minute, n_samples, n_classes, offsets, probs)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, (source, buffer["minute"], rows.shape[0], rows.shape[1],
+                          offsets.tobytes(), rows.tobytes()))
+
+                    sums = rows.astype(np.float32).sum(axis=0) / 255.0
+                    start = buffer["minute"] * 60
+                    for resolution in (ROLLUP_MINUTE, ROLLUP_HOUR):
+                        self._add_to_rollup(conn, source, resolution,
+                                            start // resolution * resolution, rows.shape[0], sums)
+            conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Błąd zapisu bloków emocji: {e}")
+
+    def _add_to_rollup(self, conn, source, resolution, bucket, count, sums):
+        row = conn.execute("""
+            SELECT count, sums FROM emotion_rollups
+            WHERE source = ? AND resolution = ? AND bucket = ?
+        """, (source, resolution, bucket)).fetchone()
+        if row:
+            previous = np.frombuffer(row[1], dtype=np.float32)
+            if previous.size == sums.size:
+                count += row[0]
+                sums = sums + previous
+        conn.execute("""
+            INSERT OR REPLACE INTO emotion_rollups (source, resolution, bucket, count, sums)
+            VALUES (?, ?, ?, ?, ?)
+        """, (source, resolution, bucket, count, sums.astype(np.float32).tobytes()))
+
+    # ----- Odczyt -----
+    def read_range(self, source, start_ts, end_ts):
+        """
+        Odczyty z zakresu [start_ts, end_ts).
+        Zwraca (timestamps: int64[n], probs: float32[n, n_classes]).
+        """
+        first_minute = int(start_ts) // 60
+        last_minute = (int(end_ts) - 1) // 60
+        timestamps, probs = [], []
+
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.execute("""
+                SELECT minute, n_samples, n_classes, offsets, probs FROM emotion_blocks
+                WHERE source = ? AND minute BETWEEN ? AND ?
+                ORDER BY minute, id
+            """, (source, first_minute, last_minute))
+            for minute, n_samples, n_classes, offsets, data in cursor:
+                timestamps.append(minute * 60 + np.frombuffer(offsets, dtype=np.uint8).astype(np.int64))
+                probs.append(np.frombuffer(data, dtype=np.uint8).reshape(n_samples, n_classes))
+            conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Błąd odczytu bloków emocji: {e}")
+
+        # Niezapisana jeszcze bieżąca minuta
+        with self._lock:
+            buffer = self._buffers.get(source)
+            if buffer is not None and first_minute <= buffer["minute"] <= last_minute:
+                timestamps.append(buffer["minute"] * 60 + np.asarray(buffer["offsets"], dtype=np.int64))
+                probs.append(np.vstack(buffer["rows"]))
+
+        if not timestamps:
+            return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+
+        # Bloki o różnej liczbie klas nie dają się złożyć – bierzemy najnowszy kształt
+        n_classes = probs[-1].shape[1]
+        pairs = [(t, p) for t, p in zip(timestamps, probs) if p.shape[1] == n_classes]
+        ts = np.concatenate([t for t, _ in pairs])
+        values = np.concatenate([p for _, p in pairs]).astype(np.float32) / 255.0
+        mask = (ts >= start_ts) & (ts < end_ts)
+        return ts[mask], values[mask]
+
+    def get_rollups(self, source, start_ts, end_ts, resolution=ROLLUP_MINUTE):
+        """
+        Średnie prawdopodobieństwa w przedziałach minutowych/godzinowych z [start_ts, end_ts).
+        Zwraca (buckets: int64[m], means: float32[m, n_classes], counts: int64[m]).
+        """
+        buckets, means, counts = [], [], []
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.execute("""
+                SELECT bucket, count, sums FROM emotion_rollups
+                WHERE source = ? AND resolution = ? AND bucket >= ? AND bucket < ?
+                ORDER BY bucket
+            """, (source, resolution, int(start_ts) // resolution * resolution, int(end_ts)))
+            for bucket, count, sums in cursor:
+                buckets.append(bucket)
+                counts.append(count)
+                means.append(np.frombuffer(sums, dtype=np.float32) / count)
+            conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Błąd odczytu agregatów emocji: {e}")
+
+        if not buckets:
+            return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32), np.empty(0, dtype=np.int64)
+        n_classes = means[-1].size
+        keep = [i for i, m in enumerate(means) if m.size == n_classes]
+        return (np.asarray([buckets[i] for i in keep], dtype=np.int64),
+                np.vstack([means[i] for i in keep]),
+                np.asarray([counts[i] for i in keep], dtype=np.int64))
@@ -0,0 +1,127 @@
+from datetime import date, timedelta
+
+# Reguły powtarzania zadań (tabela task_recurrence) i leniwe rozwijanie
+# wystąpień – tylko dla zakresu dat, o który pyta kalendarz. Przyszłe
+# wystąpienia nigdy nie są zapisywane jako osobne wiersze.
+
+FREQ_DAILY = "daily"
+FREQ_WEEKLY = "weekly"
+FREQ_MONTHLY = "monthly"
+FREQUENCIES = (FREQ_DAILY, FREQ_WEEKLY, FREQ_MONTHLY)
+
+# Maska dni tygodnia: bit 0 = poniedziałek ... bit 6 = niedziela
+WORKDAYS = 0b0011111
+
+# Status wyjątku oznaczający pominięte wystąpienie
+STATUS_SKIPPED = "Skipped"
+
+
+def weekdays_mask(weekdays):
+    """Lista numerów dni (0 = poniedziałek) -> maska bitowa."""
+    mask = 0
+    for day in weekdays:
+        mask |= 1 << day
+    return mask
+
+
+def same_rule(a, b):
+    """Czy dwie reguły (słowniki jak w task_recurrence albo None) dają te same wystąpienia – bez daty startu."""
+    if not a or not b:
+        return not a and not b
+    return (a["freq"] == b["freq"]
+            and int(a.get("interval") or 1) == int(b.get("interval") or 1)
+            and int(a.get("weekdays") or 0) == int(b.get("weekdays") or 0)
+            and (a.get("until") or None) == (b.get("until") or None))
+
+
+def expand(rule, range_start, range_end):
+    """
+    Daty wystąpień reguły `rule` w zakresie [range_start, range_end] (obie granice włącznie).
+    rule: słownik z kluczami freq, interval, weekdays (maska), start (date), until (date albo None).
+    Koszt zależy od długości zakresu, a nie od tego, jak dawno reguła się zaczęła.
+    """
+    start = rule["start"]
+    interval = max(int(rule.get("interval") or 1), 1)
+    first = max(range_start, start)
+    last = range_end if rule.get("until") is None else min(range_end, rule["until"])
+    if first > last:
+        return []
+
+    freq = rule["freq"]
+    if freq == FREQ_DAILY:
+        # Pierwsze wystąpienie >= first: przeskok o pełne interwały od startu
+        offset = (first - start).days
+        day = start + timedelta(days=-(-offset // interval) * interval)
+        step = timedelta(days=interval)
+        result = []
+        while day <= last:
+            result.append(day)
+            day += step
+        return result
+
+    if freq == FREQ_WEEKLY:
+        mask = rule.get("weekdays") or (1 << start.weekday())
+        start_week = start - timedelta(days=start.weekday())
+        result = []
+        day = first
+        while day <= last:
+            if mask >> day.weekday() & 1 and ((day - start_week).days // 7) % interval == 0:
+                result.append(day)
+            day += timedelta(days=1)
+        return result
+
+    if freq == FREQ_MONTHLY:
+        # Ten sam dzień miesiąca co start; miesiące bez takiego dnia są pomijane
+        start_index = start.year * 12 + start.month - 1
+        index = first.year * 12 + first.month - 1
+        index += -(index - start_index) % interval
+        result = []
+        while True:
+            year, month = divmod(index, 12)
+            try:
+                day = date(year, month + 1, start.day)
+            except ValueError:
+                day = None
+            if day is not None:
+                if day > last:
+                    break
+                if day >= first:
+                    result.append(day)
+            elif date(year, month + 1, 1) > last:
+                break
+            index += interval
+        return result
+
+    raise ValueError(f"Nieznana częstotliwość powtarzania: {freq}")
+
+
+def occurrences(rule, range_start, range_end, overrides=()):
+    """
+    Wystąpienia w zakresie [range_start, range_end] z nałożonymi wyjątkami.
+    overrides: krotki (occurrence_date, status, moved_to) – daty jako date,
+    status/moved_to mogą być None.
+    Zwraca listę (data_wystąpienia, pierwotna_data, status_albo_None) posortowaną po dacie.
+    """
+    overrides = {original: (status, moved_to) for original, status, moved_to in overrides}
+    result = []
+    for day in expand(rule, range_start, range_end):
+        status, moved_to = overrides.pop(day, (None, None))
+        if status == STATUS_SKIPPED or moved_to is not None:
+            if moved_to is not None and status != STATUS_SKIPPED and range_start <= moved_to <= range_end:
+                result.append((moved_to, day, status))
+            continue
+        result.append((day, day, status))
+
+    # Wystąpienia spoza zakresu przeniesione do zakresu
+    for original, (status, moved_to) in overrides.items():
+        if (moved_to is not None and status != STATUS_SKIPPED and range_start <= moved_to <= range_end
+                and not (range_start <= original <= range_end) and is_occurrence(rule, original)):
+            result.append((moved_to, original, status))
+
+    result.sort(key=lambda item: item[0])
+    return result
+
+
+def is_occurrence(rule, day):
+    """Czy `day` jest wystąpieniem reguły (bez wyjątków)."""
+    return bool(expand(rule, day, day))
@@ -0,0 +1,243 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+from data.database import TABLE_SCHEMAS, NOW_MS
+from data.emotion_timeseries import TABLE_SCHEMAS as EMOTION_SCHEMAS
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400
+
+# Po ilu dniach szczegóły są przenoszone z bazy roboczej do archiwum.
+# None wyłącza politykę dla danej tabeli.
+DEFAULT_POLICIES = {
+    "moods": 365,
+    "pomodoro_sessions": 180,
+    "emotion_blocks": 30,          # surowe odczyty; agregaty zostają
+    "emotion_rollups_minute": 90,  # agregaty minutowe; godzinowe zostają na stałe
+}
+
+LOCAL_DAY = "CAST(strftime('%s', date({column}, 'unixepoch', 'localtime'), 'utc') AS INTEGER)"
+
+class RetentionManager:
+    """
+    Polityki retencji, archiwizacja i kompaktowanie bazy SQLite.
+
+    Stare szczegóły są najpierw zwijane do dziennych podsumowań w bazie
+    roboczej (mood_daily_summary, session_daily_summary), potem kopiowane do
+    dołączonej (ATTACH) bazy archiwum i usuwane z bazy roboczej – wszystko
+    w jednej transakcji. Usunięcia nie trafiają do dziennika synchronizacji,
+    bo archiwizacja jest lokalna dla danej kopii; wpis wiersza w dzienniku
+    zastępuje znacznik 'A', żeby inne kopie nie przysłały go z powrotem.
+
+    Wolne strony oddaje w tle `PRAGMA incremental_vacuum` (baza ma
+    auto_vacuum = INCREMENTAL), małymi porcjami, żeby nie blokować zapisów.
+    """
+
+    VACUUM_PAGES_PER_RUN = 2000
+
+    def __init__(self, db_manager, archive_path="data/adhd_archive.db", policies=None):
+        self.db_manager = db_manager
+        self.db_path = db_manager.db_path
+        self.archive_path = archive_path
+        self.policies = dict(DEFAULT_POLICIES)
+        if policies:
+            self.policies.update(policies)
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ----- Retencja -----
+    def apply_policies(self, now=None):
+        """Archiwizuje szczegóły starsze niż limity polityk. Zwraca liczbę przeniesionych wierszy per tabela."""
+        now = time.time() if now is None else now
+        self.db_manager.flush()
+        moved = {}
+        try:
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            conn.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("UPDATE sync_meta SET value = '1' WHERE key = 'suppress_changelog'")
+
+                days = self.policies.get("moods")
+                if days is not None:
+                    moved["moods"] = self._archive_moods(conn, int(now - days * DAY))
+                days = self.policies.get("pomodoro_sessions")
+                if days is not None:
+                    moved["pomodoro_sessions"] = self._archive_sessions(conn, int(now - days * DAY))
+                if self._table_exists(conn, "emotion_blocks"):
+                    days = self.policies.get("emotion_blocks")
+                    if days is not None:
+                        moved["emotion_blocks"] = self._move_to_archive(
+                            conn, "emotion_blocks", "minute < ?", (int(now - days * DAY) // 60,)
+                        )
+                    days = self.policies.get("emotion_rollups_minute")
+                    if days is not None:
+                        moved["emotion_rollups_minute"] = self._move_to_archive(
+                            conn, "emotion_rollups", "resolution = 60 AND bucket < ?", (int(now - days * DAY),)
+                        )
+
+                conn.execute("UPDATE sync_meta SET value = '0' WHERE key = 'suppress_changelog'")
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.execute("DETACH DATABASE archive")
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Błąd stosowania polityk retencji: {e}")
+            return {}
+
+        self.db_manager._invalidate("moods")
+        self.db_manager._invalidate("pomodoro_sessions")
+        if any(moved.values()):
+            logger.info(f"Retencja: przeniesiono do archiwum {moved}")
+        return moved
+
+    def _archive_moods(self, conn, cutoff):
+        conn.execute("""
+            INSERT INTO mood_daily_summary (day, entries, energy_sum, focus_sum)
+            SELECT date, COUNT(*), COALESCE(SUM(energy_level), 0), COALESCE(SUM(focus_level), 0)
+            FROM main.moods WHERE date < ? GROUP BY date
+            ON CONFLICT(day) DO UPDATE SET
+                entries = entries + excluded.entries,
+                energy_sum = energy_sum + excluded.energy_sum,
+                focus_sum = focus_sum + excluded.focus_sum
+        """, (cutoff,))
+        return self._move_to_archive(conn, "moods", "date < ?", (cutoff,), synced=True)
+
+    def _archive_sessions(self, conn, cutoff):
+        where = "start_time < ? AND end_time IS NOT NULL"
+        conn.execute(f"""
+            INSERT INTO session_daily_summary (day, sessions, completed, minutes)
+            SELECT {LOCAL_DAY.format(column='start_time')} AS day, COUNT(*),
+                   COALESCE(SUM(completed), 0), COALESCE(SUM(actual_duration), 0)
+            FROM main.pomodoro_sessions WHERE {where} GROUP BY day
+            ON CONFLICT(day) DO UPDATE SET
+                sessions = sessions + excluded.sessions,
+                completed = completed + excluded.completed,
+                minutes = minutes + excluded.minutes
+        """, (cutoff,))
+        return self._move_to_archive(conn, "pomodoro_sessions", where, (cutoff,), synced=True)
+
+    def _move_to_archive(self, conn, table, where, params, synced=False):
+        """Kopiuje wiersze spełniające `where` do archive.<table> i usuwa je z bazy roboczej."""
+        columns = self._prepare_archive_table(conn, table)
+        conn.execute(f"""
+            INSERT INTO archive.{table} ({columns})
+            SELECT {columns} FROM main.{table} WHERE {where}
+        """, params)
+        if synced:
+            # Znacznik 'A' zastępuje wpis wiersza: apply_changes odrzuca każdą przychodzącą
+            # zmianę tego uid, więc kopia, która go jeszcze nie zarchiwizowała, nie przywróci go
+            conn.execute(f"""
+                INSERT OR REPLACE INTO change_log (table_name, row_uid, op, changed_at, origin)
+                SELECT '{table}', uid, 'A', {NOW_MS}, (SELECT value FROM sync_meta WHERE key = 'site_id')
+                FROM main.{table} WHERE {where}
+            """, params)
+        cursor = conn.execute(f"DELETE FROM main.{table} WHERE {where}", params)
+        return cursor.rowcount
+
+    def _prepare_archive_table(self, conn, table):
+        """
+        Tworzy archive.<table> ze schematu tabeli roboczej i dodaje kolumny, które
+        przybyły w nowszych wersjach schematu. Zwraca listę kolumn do kopiowania –
+        jawnie, bez zależności od kolejności kolumn w obu bazach.
+        """
+        schema = TABLE_SCHEMAS.get(table) or EMOTION_SCHEMAS[table]
+        conn.execute(schema.format(name=f"archive.{table}"))
+        main_columns = [(row[1], row[2]) for row in conn.execute(f"PRAGMA main.table_info({table})")]
+        archived = {row[1] for row in conn.execute(f"PRAGMA archive.table_info({table})")}
+        for name, col_type in main_columns:
+            if name not in archived:
+                conn.execute(f"ALTER TABLE archive.{table} ADD COLUMN {name} {col_type}")
+        return ", ".join(name for name, _type in main_columns)
+
+    def _table_exists(self, conn, table):
+        row = conn.execute("SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        return row.fetchone() is not None
+
+    # ----- Kompaktowanie -----
+    def incremental_vacuum(self, max_pages=None):
+        """Oddaje systemowi do `max_pages` wolnych stron. Zwraca liczbę zwolnionych stron."""
+        max_pages = self.VACUUM_PAGES_PER_RUN if max_pages is None else max_pages
+        try:
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if before:
+                # executescript krokuje polecenie do końca; execute() zwolniłby jedną stronę
+                conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages)});")
+            after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            conn.close()
+            return before - after
+        except sqlite3.Error as e:
+            logger.error(f"Błąd incremental_vacuum: {e}")
+            return 0
+
+    def size_report(self):
+        """Rozmiar bazy roboczej i archiwum, wolne strony i liczba wierszy/bajtów na tabelę."""
+        self.db_manager.flush()
+        report = {"tables": {}}
+        try:
+            conn = sqlite3.connect(self.db_path)
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            report.update({
+                "file_bytes": os.path.getsize(self.db_path),
+                "page_size": page_size,
+                "page_count": conn.execute("PRAGMA page_count").fetchone()[0],
+                "free_pages": conn.execute("PRAGMA freelist_count").fetchone()[0],
+                "auto_vacuum": {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}.get(
+                    conn.execute("PRAGMA auto_vacuum").fetchone()[0]),
+                "archive_bytes": (os.path.getsize(self.archive_path)
+                                  if os.path.exists(self.archive_path) else 0),
+            })
+
+            tables = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            )]
+            sizes = {}
+            try:
+                # dbstat nie jest wkompilowany w każdą wersję SQLite
+                sizes = dict(conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall())
+            except sqlite3.OperationalError:
+                pass
+            for table in tables:
+                rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                report["tables"][table] = {"rows": rows, "bytes": sizes.get(table)}
+            conn.close()
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"Błąd raportu rozmiaru bazy: {e}")
+        return report
+
+    # ----- Harmonogram -----
+    def start(self, vacuum_interval=600, retention_interval=DAY):
+        """Uruchamia wątek w tle: incremental_vacuum co vacuum_interval s, polityki co retention_interval s."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(vacuum_interval, retention_interval), name="retention", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self, vacuum_interval, retention_interval):
+        last_retention = None
+        while True:
+            if last_retention is None or time.monotonic() - last_retention >= retention_interval:
+                self.apply_policies()
+                last_retention = time.monotonic()
+            self.incremental_vacuum()
+            if self._stop.wait(vacuum_interval):
+                break
@@ -0,0 +1,219 @@
+import sqlite3
+import logging
+
+from data.database import SYNCED_TABLES
+
+logger = logging.getLogger(__name__)
+
+# Kolumny przesyłane między kopiami bazy (bez lokalnego `id`).
+# W sesjach `task_id` zamieniamy na `task_uid`, bo numeracja id jest lokalna.
+SYNC_COLUMNS = {
+    "tasks": (
+        "title", "description", "priority", "status", "due_date",
+        "created_at", "modified_at", "focus_score", "recommended_session",
+    ),
+    "moods": ("date", "mood", "notes", "energy_level", "focus_level"),
+    "pomodoro_sessions": (
+        "start_time", "end_time", "planned_duration", "actual_duration", "completed",
+        "elapsed_seconds", "paused", "checkpoint_time",
+    ),
+}
+
+class SyncManager:
+    """
+    Synchronizacja przyrostowa między kopiami bazy (np. laptop i komputer stacjonarny).
+
+    Wyzwalacze na tabelach zapisują w `change_log` najnowszą zmianę każdego
+    wiersza z rosnącym numerem `seq`. Eksport wysyła tylko wpisy z `seq`
+    większym niż znacznik (watermark) odbiorcy, więc koszt zależy od liczby
+    zmian, a nie od rozmiaru bazy.
+
+    Konflikty rozstrzyga reguła „ostatni zapis wygrywa” po (changed_at, origin) –
+    ta sama para zmian daje ten sam wynik niezależnie od kierunku i kolejności.
+    Wiersze zarchiwizowane przez retencję mają w dzienniku znacznik 'A' – nie są
+    eksportowane, a ich zmiany z innych kopii są odrzucane.
+    """
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.db_path = db_manager.db_path
+        self._site_id = None
+
+    @property
+    def site_id(self):
+        if self._site_id is None:
+            conn = sqlite3.connect(self.db_path)
+            row = conn.execute("SELECT value FROM sync_meta WHERE key = 'site_id'").fetchone()
+            conn.close()
+            self._site_id = row[0]
+        return self._site_id
+
+    def regenerate_site_id(self):
+        """Nowy site_id – dla kopii pliku bazy, która przejęła identyfikator oryginału."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            with conn:
+                conn.execute("UPDATE sync_meta SET value = lower(hex(randomblob(8))) WHERE key = 'site_id'")
+            conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Błąd zmiany site_id: {e}")
+            return False
+        self._site_id = None
+        logger.info(f"Nowy site_id bazy {self.db_path}: {self.site_id}")
+        return True
+
+    def get_watermark(self, peer_id):
+        """Ostatni seq kopii `peer_id` przyjęty przez tę bazę (0, gdy nigdy)."""
+        conn = sqlite3.connect(self.db_path)
+        row = conn.execute("SELECT last_seq FROM sync_peers WHERE peer_id = ?", (peer_id,)).fetchone()
+        conn.close()
+        return row[0] if row else 0
+
+    # ----- Eksport -----
+    def export_changes(self, since_seq=0, exclude_origin=None):
+        """
+        Zmiany z seq > since_seq jako słownik gotowy do serializacji (JSON).
+        exclude_origin: pomija zmiany, które przyszły od odbiorcy (bez odbijania echa).
+        """
+        self.db_manager.flush()
+        changes = []
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            high_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+
+            for table in SYNCED_TABLES:
+                columns = ", ".join(f"t.{c}" for c in SYNC_COLUMNS[table])
+                if table == "pomodoro_sessions":
+                    columns += ", (SELECT uid FROM tasks WHERE tasks.id = t.task_id) AS task_uid"
+                cursor = conn.execute(f"""
+                    SELECT c.seq, c.row_uid, c.op, c.changed_at, c.origin, t.uid AS present, {columns}
+                    FROM change_log c
+                    LEFT JOIN {table} t ON t.uid = c.row_uid
+                    WHERE c.table_name = ? AND c.seq > ? AND c.origin != ? AND c.op != 'A'
+                """, (table, since_seq, exclude_origin or ""))
+                for row in cursor:
+                    row = dict(row)
+                    present = row.pop("present")
+                    change = {key: row.pop(key) for key in ("seq", "row_uid", "op", "changed_at", "origin")}
+                    if change["op"] == "U":
+                        if present is None:
+                            continue  # wiersz usunięty lokalnie bez dziennika
+                        change["row"] = row
+                    change["table"] = table
+                    changes.append(change)
+            conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Błąd eksportu zmian: {e}")
+            return {"site_id": self.site_id, "high_seq": since_seq, "changes": []}
+
+        changes.sort(key=lambda c: c["seq"])
+        return {"site_id": self.site_id, "high_seq": high_seq, "changes": changes}
+
+    # ----- Import -----
+    def apply_changes(self, payload):
+        """
+        Nakłada zmiany z innej kopii w jednej transakcji i zapamiętuje jej znacznik.
+        Zwraca {"applied": n, "skipped": m}.
+        """
+        self.db_manager.flush()
+        applied = skipped = 0
+        touched = set()
+        try:
+            conn = sqlite3.connect(self.db_path)
+            with conn:
+                # Zmiany z zewnątrz nie mogą trafić do dziennika jako lokalne
+                conn.execute("UPDATE sync_meta SET value = '1' WHERE key = 'suppress_changelog'")
+                for change in sorted(payload["changes"], key=self._apply_order):
+                    table = change["table"]
+                    if table not in SYNC_COLUMNS:
+                        skipped += 1
+                        continue
+
+                    local = conn.execute("""
+                        SELECT changed_at, origin, op FROM change_log
+                        WHERE table_name = ? AND row_uid = ?
+                    """, (table, change["row_uid"])).fetchone()
+                    # Wiersz zarchiwizowany tutaj ('A') nie wraca z innej kopii – znacznik wygrywa zawsze
+                    if local and (local[2] == "A" or tuple(local[:2]) >= (change["changed_at"], change["origin"])):
+                        skipped += 1
+                        continue
+
+                    if change["op"] == "D":
+                        conn.execute(f"DELETE FROM {table} WHERE uid = ?", (change["row_uid"],))
+                    else:
+                        self._upsert(conn, table, change["row_uid"], change["row"])
+
+                    conn.execute("""
+                        INSERT OR REPLACE INTO change_log (table_name, row_uid, op, changed_at, origin)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, (table, change["row_uid"], change["op"], change["changed_at"], change["origin"]))
+                    touched.add(table)
+                    applied += 1
+
+                conn.execute("UPDATE sync_meta SET value = '0' WHERE key = 'suppress_changelog'")
+                conn.execute("""
+                    INSERT INTO sync_peers (peer_id, last_seq) VALUES (?, ?)
+                    ON CONFLICT(peer_id) DO UPDATE SET last_seq = MAX(last_seq, excluded.last_seq)
+                """, (payload["site_id"], payload["high_seq"]))
+            conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Błąd nakładania zmian: {e}")
+            return {"applied": 0, "skipped": len(payload["changes"])}
+
+        for table in touched:
+            self.db_manager._invalidate(table)
+        logger.info(f"Synchronizacja od {payload['site_id']}: {applied} zmian, {skipped} pominiętych.")
+        return {"applied": applied, "skipped": skipped}
+
+    @staticmethod
+    def _apply_order(change):
+        """
+        Kolejność tabel z SYNCED_TABLES (zadania przed sesjami), w tabeli – seq.
+        Sesja odwołuje się do zadania przez task_uid, więc zadanie musi już istnieć,
+        nawet jeśli jego ostatnia zmiana ma wyższy seq niż zmiana sesji.
+        """
+        table = change["table"]
+        rank = SYNCED_TABLES.index(table) if table in SYNCED_TABLES else len(SYNCED_TABLES)
+        return rank, change["seq"]
+
+    def _upsert(self, conn, table, uid, row):
+        columns = list(SYNC_COLUMNS[table])
+        values = [row.get(c) for c in columns]
+        placeholders = ["?"] * len(columns)
+        if table == "pomodoro_sessions":
+            columns.append("task_id")
+            placeholders.append("(SELECT id FROM tasks WHERE uid = ?)")
+            values.append(row.get("task_uid"))
+
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns)
+        conn.execute(f"""
+            INSERT INTO {table} (uid, {', '.join(columns)})
+            VALUES (?, {', '.join(placeholders)})
+            ON CONFLICT(uid) DO UPDATE SET {updates}
+        """, [uid] + values)
+
+    def sync_with(self, other):
+        """
+        Dwukierunkowa synchronizacja z inną kopią (SyncManager drugiej bazy).
+
+        Plik skopiowany ręcznie ma ten sam site_id co oryginał – wtedy `other`
+        dostaje nowy identyfikator, a pierwsza wymiana idzie bez filtra
+        pochodzenia: zmiany zrobione po skopiowaniu mają jeszcze stary site_id,
+        a wspólne wpisy sprzed kopii odrzuca reguła „ostatni zapis wygrywa”.
+        """
+        exclude_self, exclude_other = self.site_id, other.site_id
+        if self.site_id == other.site_id:
+            logger.warning(f"Bazy {self.db_path} i {other.db_path} mają ten sam site_id (kopia pliku).")
+            if not other.regenerate_site_id():
+                empty = {"applied": 0, "skipped": 0}
+                return empty, dict(empty)
+            exclude_self = exclude_other = None
+
+        sent = other.apply_changes(
+            self.export_changes(other.get_watermark(self.site_id), exclude_origin=exclude_other)
+        )
+        received = self.apply_changes(
+            other.export_changes(self.get_watermark(other.site_id), exclude_origin=exclude_self)
+        )
+        return sent, received
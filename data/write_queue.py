@@ -0,0 +1,193 @@
+import time
+import atexit
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Błędy chwilowe: paczka jest wycofywana i ponawiana, a nie pomijana
+_TRANSIENT_ERRORS = ("database is locked", "database table is locked", "database is busy",
+                     "disk i/o error", "database or disk is full")
+
+def _is_transient(error):
+    return isinstance(error, sqlite3.OperationalError) and any(
+        message in str(error).lower() for message in _TRANSIENT_ERRORS
+    )
+
+class WriteBehindQueue:
+    """
+    Kolejka zapisów grupowanych w jedną transakcję (group commit).
+
+    Zapisy trafiają do pamięci i są zatwierdzane przez wątek w tle jedną
+    transakcją co `interval` sekund albo po zebraniu `max_batch` poleceń –
+    zależnie od tego, co nastąpi pierwsze. Zamiast fsync na każdy zapis
+    jest jeden fsync na paczkę.
+
+    Utrata danych przy awarii jest ograniczona: przepadają tylko zapisy
+    niezatwierdzone, czyli co najwyżej te z ostatnich `interval` sekund
+    i nie więcej niż `max_batch` poleceń. `flush()` wymusza zapis
+    natychmiast; przy normalnym zakończeniu procesu kolejka opróżnia się sama
+    (atexit).
+
+    Gdy baza jest zablokowana przez inny proces, paczka jest wycofywana
+    i zostaje w kolejce – ponowienie po `retry_delay` s, z odstępem
+    podwajanym do `max_retry_delay`. Pomijane (z wpisem w logu) są tylko
+    polecenia odrzucone z powodu danych, np. IntegrityError; polecenia
+    z jednego `submit_many` są pomijane razem (SAVEPOINT), nigdy częściowo.
+    """
+
+    def __init__(self, db_path, interval=1.0, max_batch=500, retry_delay=0.1, max_retry_delay=5.0):
+        self.db_path = db_path
+        self.interval = interval
+        self.max_batch = max_batch
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.commits = 0           # zatwierdzone paczki
+        self.retries = 0           # paczki wycofane z powodu blokady i ponowione
+
+        self._pending = []         # grupy poleceń: listy (sql, params) zapisywane w całości albo wcale
+        self._pending_count = 0    # liczba poleceń we wszystkich grupach
+        self._submitted = 0        # numer ostatniego przyjętego polecenia
+        self._committed = 0        # numer ostatniego zatwierdzonego polecenia
+        self._first_pending_at = None
+        self._flush_requested = False
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, sql, params=()):
+        self.submit_many([(sql, params)])
+
+    def submit_many(self, statements):
+        """
+        Dodaje kilka poleceń naraz – trafią do tej samej paczki, bez wtrąceń innych wątków.
+        Są zapisywane razem: błąd jednego wycofuje całą grupę (np. zadanie z regułą
+        powtarzania odwołującą się do last_insert_rowid()).
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Kolejka zapisów jest zamknięta.")
+            if not statements:
+                return
+            first = not self._pending
+            if first:
+                self._first_pending_at = time.monotonic()
+            self._pending.append(list(statements))
+            self._pending_count += len(statements)
+            self._submitted += len(statements)
+            # wątek czeka bez limitu, gdy kolejka jest pusta – trzeba go obudzić,
+            # żeby odmierzył interwał; potem budzi go dopiero pełna paczka
+            if first or self._pending_count >= self.max_batch:
+                self._cond.notify_all()
+
+    def pending(self):
+        with self._cond:
+            return self._submitted - self._committed
+
+    def flush(self, timeout=None):
+        """
+        Blokuje, aż wszystkie przyjęte dotąd zapisy zostaną zatwierdzone.
+        Zwraca False, gdy w ciągu `timeout` sekund się to nie udało (np. baza zablokowana).
+        """
+        with self._cond:
+            target = self._submitted
+            if self._committed >= target:
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._committed >= target, timeout)
+
+    def close(self):
+        """Opróżnia kolejkę i zatrzymuje wątek. Wywołanie wielokrotne jest bezpieczne."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def _batch_ready(self):
+        if self._closed or self._flush_requested or self._pending_count >= self.max_batch:
+            return True
+        return bool(self._pending) and time.monotonic() - self._first_pending_at >= self.interval
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, isolation_level=None)  # BEGIN/COMMIT w _commit_batch
+        delay = self.retry_delay
+        try:
+            while True:
+                with self._cond:
+                    while not self._batch_ready():
+                        if self._pending:
+                            wait = self.interval - (time.monotonic() - self._first_pending_at)
+                            self._cond.wait(max(wait, 0.0))
+                        else:
+                            self._cond.wait()
+                    batch = self._pending
+                    size = self._pending_count
+                    self._pending = []
+                    self._pending_count = 0
+                    self._flush_requested = False
+                    closing = self._closed
+
+                if batch and not self._commit_batch(conn, batch):
+                    # Paczka wycofana w całości – wraca na początek kolejki, przed nowsze zapisy
+                    with self._cond:
+                        self._pending = batch + self._pending
+                        self._pending_count += size
+                        self._first_pending_at = time.monotonic()
+                        self._flush_requested = True  # po odczekaniu ponawiamy bez czekania na interwał
+                        self.retries += 1
+                    logger.warning(f"Baza zablokowana – ponowienie zapisu {size} poleceń za {delay:.1f} s.")
+                    time.sleep(delay)
+                    delay = min(delay * 2, self.max_retry_delay)
+                    continue
+                delay = self.retry_delay
+
+                if batch:
+                    with self._cond:
+                        self._committed += size
+                        self.commits += 1
+                        self._cond.notify_all()
+
+                if closing:
+                    with self._cond:
+                        if not self._pending:
+                            break
+        finally:
+            conn.close()
+
+    def _commit_batch(self, conn, batch):
+        """
+        Jedna transakcja na paczkę, każda grupa poleceń w osobnym SAVEPOINT. Grupa
+        odrzucona z powodu danych jest wycofywana w całości, logowana i pomijana.
+        Błąd chwilowy (blokada, pełny dysk) wycofuje całą paczkę – wtedy False.
+        """
+        try:
+            conn.execute("BEGIN")
+            for group in batch:
+                conn.execute("SAVEPOINT write_group")
+                try:
+                    for sql, params in group:
+                        conn.execute(sql, params)
+                except sqlite3.Error as e:
+                    if _is_transient(e):
+                        raise
+                    conn.execute("ROLLBACK TO write_group")
+                    logger.error(f"Błąd zapisu w kolejce – grupa {len(group)} poleceń wycofana: {e}")
+                conn.execute("RELEASE write_group")
+            conn.execute("COMMIT")
+            logger.debug(f"Zatwierdzono paczkę {len(batch)} grup zapisów.")
+            return True
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            if _is_transient(e):
+                return False
+            logger.error(f"Błąd zatwierdzania paczki zapisów ({len(batch)}): {e}")
+            return True
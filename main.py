@@ -1,9 +1,10 @@
 import sys
 import os
 import logging
-from PyQt6.QtWidgets import QApplication
+from PyQt6.QtWidgets import QApplication, QMessageBox
 from PyQt6.QtCore import QFile, QTextStream, QIODevice
-from data.database import DatabaseManager
+from data.database import DatabaseManager, MigrationError
+from data.retention import RetentionManager
 from ui.main_window import MainWindow
 
 logging.basicConfig(
@@ -27,6 +28,28 @@ def load_stylesheet(app):
             app.setStyleSheet(stream.readAll())
             file.close()
 
+def start_emotion_stream():
+    """
+    Analiza emocji z kamery i mikrofonu w tle (opcja --emotion).
+    Modele działają w osobnym procesie (InferenceWorker) – GUI nie ładuje TensorFlow.
+    Zwraca (fusion, stream, worker) albo (None, None, None), gdy uruchomienie się nie powiodło.
+    """
+    try:
+        from ai.emotion_fusion import EmotionFusion
+        from ai.emotion_stream import EmotionStream
+        from ai.inference_worker import InferenceWorker
+        from data.emotion_timeseries import EmotionTimeSeries
+
+        worker = InferenceWorker()
+        worker.start()
+        fusion = EmotionFusion()
+        stream = EmotionStream(worker, fusion, timeseries=EmotionTimeSeries())
+        stream.start()
+        return fusion, stream, worker
+    except Exception as e:
+        logger.error(f"Nie udało się uruchomić analizy emocji: {e}")
+        return None, None, None
+
 def main():
     ensure_directories()
 
@@ -35,11 +58,27 @@ def main():
 
     load_stylesheet(app)
 
-    db_manager = DatabaseManager()
-    window = MainWindow(db_manager)
+    try:
+        # Bez cache odczytów: nie widziałby zapisów innych procesów (CLI, server.py, synchronizacja)
+        db_manager = DatabaseManager(write_behind=True)
+    except MigrationError as e:
+        QMessageBox.critical(None, "Błąd bazy danych", str(e))
+        sys.exit(1)
+    retention = RetentionManager(db_manager)
+    retention.start()
+    fusion, emotion_stream, inference_worker = (
+        start_emotion_stream() if "--emotion" in sys.argv else (None, None, None)
+    )
+    window = MainWindow(db_manager, emotion_fusion=fusion)
     window.show()
 
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    if emotion_stream is not None:
+        emotion_stream.stop()
+        inference_worker.stop()
+    retention.stop()
+    db_manager.close()
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,433 @@
+"""
+Tryb bezgłowy: lokalne API HTTP/JSON nad DatabaseManager i PomodoroAI.
+
+Nie importuje Qt. Uruchomienie:
+    python server.py --port 8765
+    python server.py --unix /tmp/adhd.sock
+"""
+import os
+import re
+import sys
+import json
+import asyncio
+import logging
+import argparse
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+
+from data.database import DatabaseManager, MigrationError, validate_date
+from data.retention import RetentionManager
+from data.recurrence import FREQUENCIES
+from ai.pomodoro_ai import PomodoroAI
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    handlers=[logging.StreamHandler()],
+)
+logger = logging.getLogger(__name__)
+
+MAX_BODY_SIZE = 1024 * 1024
+MAX_PIPELINED = 32  # ile żądań jednego połączenia może czekać na odpowiedź
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ApiServer:
+    """
+    Serwer HTTP/1.1 na asyncio z keep-alive i pipeliningiem.
+
+    Każde połączenie ma dwie pętle: czytającą żądania i piszącą odpowiedzi.
+    Żądania są czytane z wyprzedzeniem, ale wykonywane po kolei, w kolejności
+    nadejścia – późniejszy odczyt widzi wcześniejsze zapisy z tego samego
+    połączenia, a odpowiedzi wychodzą w kolejności żądań (wymóg pipeliningu
+    HTTP/1.1). Różne połączenia są obsługiwane równolegle.
+    Wywołania SQLite idą do puli wątków, więc pętla zdarzeń nigdy nie czeka na bazę.
+
+    Zapisy idą przez kolejkę write-behind: dane wejściowe są sprawdzane przed
+    przyjęciem (400 przy błędzie), a nowe zadania i nastroje dostają 202 –
+    trafiają do bazy najpóźniej po flush_interval, a kolejne odczyty już je widzą.
+    """
+
+    def __init__(self, db_manager, workers=4):
+        self.db_manager = db_manager
+        self.pomodoro_ai = PomodoroAI()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        self.routes = [
+            ("GET", r"/tasks", self.list_tasks),
+            ("POST", r"/tasks", self.create_task),
+            ("PUT", r"/tasks/(?P<task_id>\d+)", self.update_task),
+            ("DELETE", r"/tasks/(?P<task_id>\d+)", self.delete_task),
+            ("POST", r"/tasks/(?P<task_id>\d+)/occurrences", self.override_occurrence),
+            ("GET", r"/moods", self.list_moods),
+            ("POST", r"/moods", self.create_mood),
+            ("GET", r"/sessions", self.list_sessions),
+            ("GET", r"/sessions/active", self.active_session),
+            ("POST", r"/sessions", self.start_session),
+            ("POST", r"/sessions/(?P<session_id>\d+)/checkpoint", self.checkpoint_session),
+            ("POST", r"/sessions/(?P<session_id>\d+)/end", self.end_session),
+            ("GET", r"/recommendation", self.recommendation),
+            ("GET", r"/stats", self.stats),
+        ]
+        self.routes = [(method, re.compile(pattern + r"/?$"), handler) for method, pattern, handler in self.routes]
+
+    async def db(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    # ----- Połączenia -----
+    async def handle_connection(self, reader, writer):
+        responses = asyncio.Queue(maxsize=MAX_PIPELINED)
+        writer_task = asyncio.create_task(self._write_responses(writer, responses))
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                keep_alive = request["keep_alive"]
+                # Korutyna startuje dopiero w pętli piszącej – po zakończeniu poprzedniego żądania
+                await responses.put((self.dispatch(request), keep_alive))
+                if not keep_alive:
+                    break
+        except ApiError as e:
+            await responses.put((self._error(e), False))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            await responses.put(None)
+            await writer_task
+            writer.close()
+
+    async def _write_responses(self, writer, responses):
+        connected = True
+        while True:
+            item = await responses.get()
+            if item is None:
+                return
+            handler, keep_alive = item
+            if not connected:
+                handler.close()  # klient się rozłączył – pozostałych żądań nie wykonujemy
+                continue
+            status, payload = await handler
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            head = (
+                f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+            )
+            try:
+                writer.write(head.encode("ascii") + body)
+                await writer.drain()
+            except ConnectionError:
+                connected = False
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode("latin-1").strip().split(" ", 2)
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Niepoprawna linia żądania.")
+
+        headers = {}
+        while True:
+            header = await reader.readline()
+            if header in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = header.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Niepoprawny nagłówek Content-Length.")
+        if length > MAX_BODY_SIZE:
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Zbyt duże żądanie.")
+        body = await reader.readexactly(length) if length else b""
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        url = urlsplit(target)
+        return {
+            "method": method.upper(),
+            "path": url.path,
+            "query": {k: v[-1] for k, v in parse_qs(url.query).items()},
+            "body": body,
+            "keep_alive": keep_alive,
+        }
+
+    async def dispatch(self, request):
+        try:
+            for method, pattern, handler in self.routes:
+                match = pattern.match(request["path"])
+                if match and method == request["method"]:
+                    return await handler(request, **match.groupdict())
+            raise ApiError(HTTPStatus.NOT_FOUND, "Nie ma takiego zasobu.")
+        except ApiError as e:
+            return await self._error(e)
+        except Exception as e:
+            logger.exception(f"Błąd obsługi żądania {request['method']} {request['path']}: {e}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Błąd serwera."}
+
+    async def _error(self, error):
+        return error.status, {"error": error.message}
+
+    @staticmethod
+    def _json(request):
+        if not request["body"]:
+            return {}
+        try:
+            data = json.loads(request["body"])
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Niepoprawny JSON.")
+        if not isinstance(data, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Oczekiwano obiektu JSON.")
+        return data
+
+    @staticmethod
+    def _require(data, *fields):
+        missing = [f for f in fields if f not in data]
+        if missing:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Brak pól: {', '.join(missing)}")
+
+    @staticmethod
+    def _text(data, name, default=None):
+        value = data.get(name, default)
+        if not isinstance(value, str):
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Pole {name} musi być tekstem.")
+        return value
+
+    @staticmethod
+    def _int(data, name, default=None):
+        value = data.get(name, default)
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Pole {name} musi być liczbą całkowitą.")
+        return value
+
+    @staticmethod
+    def _date(data, name, allow_empty=False):
+        try:
+            return validate_date(data.get(name), allow_empty=allow_empty)
+        except ValueError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Pole {name}: {e}")
+
+    def _task_fields(self, data, priority=None, status=None):
+        title = self._text(data, "title")
+        if not title.strip():
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Pole title nie może być puste.")
+        return (
+            title,
+            self._text(data, "description", ""),
+            self._text(data, "priority", priority),
+            self._text(data, "status", status),
+            self._date(data, "due_date", allow_empty=True),
+        )
+
+    @staticmethod
+    def _int_param(query, name):
+        try:
+            return int(query[name])
+        except KeyError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Brak parametru: {name}")
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Parametr {name} musi być liczbą.")
+
+    # ----- Zadania -----
+    async def list_tasks(self, request):
+        query = request["query"]
+        if "date" in query:
+            return HTTPStatus.OK, await self.db(self.db_manager.get_task_by_date, query["date"])
+        if "from" in query or "to" in query:
+            if "from" not in query or "to" not in query:
+                raise ApiError(HTTPStatus.BAD_REQUEST, "Podaj oba parametry: from i to.")
+            return HTTPStatus.OK, await self.db(self.db_manager.get_tasks_between, query["from"], query["to"])
+        return HTTPStatus.OK, await self.db(self.db_manager.get_tasks)
+
+    async def create_task(self, request):
+        data = self._json(request)
+        self._require(data, "title")
+        fields = self._task_fields(data, priority="Medium", status="To Do")
+        await self.db(self.db_manager.add_task, *fields, recurrence=self._recurrence(data))
+        return HTTPStatus.ACCEPTED, {"accepted": True}
+
+    async def update_task(self, request, task_id):
+        data = self._json(request)
+        self._require(data, "title", "priority", "status")
+        fields = self._task_fields(data)
+        focus_score = data.get("focus_score", 0.0)
+        if not isinstance(focus_score, (int, float)) or isinstance(focus_score, bool):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Pole focus_score musi być liczbą.")
+        await self.db(self.db_manager.update_task, int(task_id), *fields, focus_score)
+        if "recurrence" in data:
+            await self.db(self.db_manager.set_task_recurrence, int(task_id), self._recurrence(data))
+        return HTTPStatus.OK, {"ok": True}
+
+    async def delete_task(self, request, task_id):
+        await self.db(self.db_manager.delete_task, int(task_id))
+        return HTTPStatus.OK, {"ok": True}
+
+    async def override_occurrence(self, request, task_id):
+        data = self._json(request)
+        self._require(data, "date")
+        status = data.get("status")
+        if status is not None and not isinstance(status, str):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Pole status musi być tekstem.")
+        await self.db(
+            self.db_manager.set_occurrence_override,
+            int(task_id),
+            self._date(data, "date"),
+            status=status,
+            moved_to=self._date(data, "moved_to", allow_empty=True),
+        )
+        return HTTPStatus.OK, {"ok": True}
+
+    def _recurrence(self, data):
+        recurrence = data.get("recurrence")
+        if recurrence is None:
+            return None
+        if not isinstance(recurrence, dict) or recurrence.get("freq") not in FREQUENCIES:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"recurrence.freq musi być jednym z: {', '.join(FREQUENCIES)}")
+        for name in ("interval", "weekdays"):
+            if recurrence.get(name) is not None:
+                self._int(recurrence, name)
+        self._date(recurrence, "until", allow_empty=True)
+        return recurrence
+
+    # ----- Nastroje -----
+    async def list_moods(self, request):
+        query = request["query"]
+        if "latest" in query:
+            return HTTPStatus.OK, await self.db(self.db_manager.get_latest_mood)
+        if "date" in query:
+            return HTTPStatus.OK, await self.db(self.db_manager.get_mood_by_date, query["date"])
+        if "start" in query or "end" in query:
+            start, end = self._int_param(query, "start"), self._int_param(query, "end")
+            return HTTPStatus.OK, await self.db(self.db_manager.get_moods_between, start, end)
+        return HTTPStatus.OK, await self.db(self.db_manager.get_moods)
+
+    async def create_mood(self, request):
+        data = self._json(request)
+        self._require(data, "date", "mood")
+        await self.db(
+            self.db_manager.add_mood,
+            self._date(data, "date"),
+            self._text(data, "mood"),
+            self._text(data, "notes", ""),
+            self._int(data, "energy_level", 5),
+            self._int(data, "focus_level", 5),
+        )
+        return HTTPStatus.ACCEPTED, {"accepted": True}
+
+    # ----- Sesje Pomodoro -----
+    async def list_sessions(self, request):
+        query = request["query"]
+        start, end = self._int_param(query, "start"), self._int_param(query, "end")
+        return HTTPStatus.OK, await self.db(self.db_manager.get_sessions_between, start, end)
+
+    async def active_session(self, request):
+        return HTTPStatus.OK, await self.db(self.db_manager.get_active_pomodoro_session)
+
+    async def start_session(self, request):
+        data = self._json(request)
+        self._require(data, "task_id")
+        task_id = self._int(data, "task_id")
+        planned = data.get("planned_duration")
+        if planned is None:
+            planned = (await self._recommend())["minutes"]
+        else:
+            planned = self._int(data, "planned_duration")
+        session_id = await self.db(self.db_manager.add_pomodoro_session, task_id, int(planned))
+        if session_id is None:
+            raise ApiError(HTTPStatus.INTERNAL_SERVER_ERROR, "Nie udało się rozpocząć sesji.")
+        return HTTPStatus.CREATED, {"id": session_id, "planned_duration": planned}
+
+    async def checkpoint_session(self, request, session_id):
+        data = self._json(request)
+        self._require(data, "elapsed_seconds")
+        await self.db(
+            self.db_manager.checkpoint_pomodoro_session,
+            int(session_id), self._int(data, "elapsed_seconds"), bool(data.get("paused", False)),
+        )
+        return HTTPStatus.OK, {"ok": True}
+
+    async def end_session(self, request, session_id):
+        data = self._json(request)
+        success = await self.db(
+            self.db_manager.end_pomodoro_session,
+            int(session_id), data.get("actual_minutes"), data.get("completed", True),
+        )
+        if not success:
+            raise ApiError(HTTPStatus.NOT_FOUND, "Nie ma takiej sesji.")
+        return HTTPStatus.OK, {"ok": True}
+
+    # ----- Rekomendacje -----
+    async def _recommend(self):
+        mood, last_sessions = await asyncio.gather(
+            self.db(self.db_manager.get_latest_mood),
+            self.db(self.db_manager.get_recent_sessions, 3),
+        )
+        mood_entry = mood or {"mood": "Neutralny", "energy_level": 5, "focus_level": 5}
+        minutes = self.pomodoro_ai.recommend_session_length(mood_entry, last_sessions)
+        return {"minutes": minutes, "mood": mood_entry}
+
+    async def recommendation(self, request):
+        return HTTPStatus.OK, await self._recommend()
+
+    async def stats(self, request):
+        return HTTPStatus.OK, {"cache": self.db_manager.cache_stats()}
+
+
+async def serve(args):
+    db_manager = DatabaseManager(cache_size=args.cache_size, write_behind=True)
+    api = ApiServer(db_manager, workers=args.workers)
+    retention = RetentionManager(db_manager)
+    retention.start()
+
+    if args.unix:
+        server = await asyncio.start_unix_server(api.handle_connection, path=args.unix)
+        logger.info(f"API nasłuchuje na gnieździe {args.unix}")
+    else:
+        server = await asyncio.start_server(api.handle_connection, args.host, args.port)
+        logger.info(f"API nasłuchuje na http://{args.host}:{args.port}")
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        api.executor.shutdown(wait=True)
+        retention.stop()
+        db_manager.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ADHD Support App – lokalne API bez interfejsu Qt.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="ścieżka gniazda Unix zamiast TCP")
+    parser.add_argument("--workers", type=int, default=4, help="wątki obsługujące SQLite")
+    # Cache nie widzi zapisów innych procesów (np. GUI na tym samym pliku bazy) – domyślnie wyłączony
+    parser.add_argument("--cache-size", type=int, default=0,
+                        help="cache odczytów; tylko gdy API jest jedynym procesem zapisującym do bazy")
+    args = parser.parse_args(argv)
+
+    os.makedirs("data", exist_ok=True)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        logger.info("Serwer zatrzymany.")
+    except MigrationError as e:
+        logger.error(str(e))
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
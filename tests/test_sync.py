@@ -0,0 +1,114 @@
+import os
+import time
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from data.database import DatabaseManager
+from data.retention import RetentionManager
+from data.sync import SyncManager
+
+
+class SyncTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path_a = os.path.join(self.tmp.name, "a.db")
+        self.path_b = os.path.join(self.tmp.name, "b.db")
+        self.db_a = DatabaseManager(db_path=self.path_a)
+        self.db_b = DatabaseManager(db_path=self.path_b)
+
+    def tearDown(self):
+        self.db_a.close()
+        self.db_b.close()
+        self.tmp.cleanup()
+
+    def sync(self):
+        return SyncManager(self.db_a).sync_with(SyncManager(self.db_b))
+
+    def titles(self, db):
+        return sorted(task["title"] for task in db.get_tasks())
+
+    def task_id(self, db, title):
+        return next(task["id"] for task in db.get_tasks() if task["title"] == title)
+
+    def edit(self, db, title, new_title):
+        time.sleep(0.01)  # changed_at ma rozdzielczość ms – kolejne zmiany muszą być późniejsze
+        db.update_task(self.task_id(db, title), new_title, "", "High", "To Do", "2025-01-10")
+
+    def test_changes_go_both_ways(self):
+        self.db_a.add_task("z laptopa", "", "High", "To Do", "2025-01-10")
+        self.db_b.add_mood("2025-01-05", "Dobry")
+        sent, received = self.sync()
+        self.assertEqual((sent["applied"], received["applied"]), (1, 1))
+        self.assertEqual(self.titles(self.db_b), ["z laptopa"])
+        self.assertEqual([m["mood"] for m in self.db_a.get_moods()], ["Dobry"])
+
+        # Druga synchronizacja bez nowych zmian nic nie przesyła (bez echa)
+        sent, received = self.sync()
+        self.assertEqual((sent["applied"], received["applied"]), (0, 0))
+
+    def test_later_edit_wins_conflict(self):
+        self.db_a.add_task("zadanie", "", "High", "To Do", "2025-01-10")
+        self.sync()
+        self.edit(self.db_a, "zadanie", "wersja A")
+        self.edit(self.db_b, "zadanie", "wersja B")
+        self.sync()
+        self.assertEqual(self.titles(self.db_a), ["wersja B"])
+        self.assertEqual(self.titles(self.db_b), ["wersja B"])
+
+    def test_delete_propagates(self):
+        self.db_a.add_task("do usunięcia", "", "High", "To Do", "2025-01-10")
+        self.db_a.add_task("zostaje", "", "High", "To Do", "2025-01-10")
+        self.sync()
+        self.db_b.delete_task(self.task_id(self.db_b, "do usunięcia"))
+        self.sync()
+        self.assertEqual(self.titles(self.db_a), ["zostaje"])
+        self.assertEqual(self.titles(self.db_b), ["zostaje"])
+
+    def test_hand_copied_file_gets_new_site_id(self):
+        self.db_a.add_task("wspólne", "", "High", "To Do", "2025-01-10")
+        self.db_b.close()
+        shutil.copy(self.path_a, self.path_b)
+        self.db_b = DatabaseManager(db_path=self.path_b)
+        self.assertEqual(SyncManager(self.db_a).site_id, SyncManager(self.db_b).site_id)
+
+        self.db_a.add_task("po kopii A", "", "High", "To Do", "2025-01-10")
+        self.db_b.add_task("po kopii B", "", "High", "To Do", "2025-01-10")
+        self.sync()
+        self.assertNotEqual(SyncManager(self.db_a).site_id, SyncManager(self.db_b).site_id)
+        expected = ["po kopii A", "po kopii B", "wspólne"]
+        self.assertEqual(self.titles(self.db_a), expected)
+        self.assertEqual(self.titles(self.db_b), expected)
+
+    def test_session_keeps_task_edited_after_it(self):
+        self.db_b.add_task("lokalne B", "", "Low", "To Do", "2025-01-10")  # inne id zadań w B
+        self.db_a.add_task("zadanie", "", "High", "To Do", "2025-01-10")
+        session_id = self.db_a.add_pomodoro_session(self.task_id(self.db_a, "zadanie"), 25)
+        self.db_a.end_pomodoro_session(session_id, 25)
+        # Zmiana zadania ma wyższy seq niż sesja – zadanie i tak musi trafić do B pierwsze
+        self.edit(self.db_a, "zadanie", "zadanie (zmienione)")
+        self.sync()
+
+        sessions = self.db_b.get_recent_sessions()
+        self.assertEqual(len(sessions), 1)
+        self.assertEqual(sessions[0]["task_id"], self.task_id(self.db_b, "zadanie (zmienione)"))
+
+    def test_archived_rows_do_not_come_back(self):
+        self.db_b.add_mood("2020-01-05", "Dobry", energy_level=8)
+        self.sync()
+        retention = RetentionManager(self.db_a, archive_path=os.path.join(self.tmp.name, "archive.db"))
+        self.assertEqual(retention.apply_policies()["moods"], 1)
+
+        # B wysyła wszystko od nowa (np. po utracie znacznika) – A nie przywraca nastroju
+        result = SyncManager(self.db_a).apply_changes(SyncManager(self.db_b).export_changes())
+        self.assertEqual(result["applied"], 0)
+        self.assertEqual(self.db_a.get_moods(), [])
+        self.assertEqual(retention.apply_policies()["moods"], 0)
+        start = time.mktime((2020, 1, 1, 0, 0, 0, 0, 0, -1))
+        summary = self.db_a.get_mood_summary(start, start + 31 * 86400)
+        self.assertEqual([(row["day"], row["entries"]) for row in summary], [("2020-01-05", 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import textwrap
+import unittest
+import subprocess
+
+from data.write_queue import WriteBehindQueue
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INSERT = "INSERT INTO items (n) VALUES (?)"
+
+# Proces „padający” bez close() i bez atexit (os._exit) – jak przy awarii aplikacji
+CRASH_SCRIPT = """
+import os, sys, time
+sys.path.insert(0, {root!r})
+from data.write_queue import WriteBehindQueue
+queue = WriteBehindQueue({path!r}, interval={interval}, max_batch={max_batch})
+{body}
+os._exit(0)
+"""
+
+
+class WriteBehindQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "queue.db")
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE items (n INTEGER PRIMARY KEY)")
+        conn.commit()
+        conn.close()
+        self.queue = None
+
+    def tearDown(self):
+        if self.queue is not None:
+            self.queue.close()
+        self.tmp.cleanup()
+
+    def rows(self):
+        conn = sqlite3.connect(self.path)
+        rows = [row[0] for row in conn.execute("SELECT n FROM items ORDER BY n")]
+        conn.close()
+        return rows
+
+    def crash(self, body, interval=60.0, max_batch=500):
+        script = CRASH_SCRIPT.format(root=ROOT, path=self.path, interval=interval,
+                                     max_batch=max_batch, body=textwrap.dedent(body))
+        subprocess.run([sys.executable, "-c", script], check=True, timeout=30)
+
+    def test_writes_coalesce_into_one_transaction(self):
+        self.queue = WriteBehindQueue(self.path, interval=60.0)
+        for n in range(100):
+            self.queue.submit(INSERT, (n,))
+        self.assertEqual(self.queue.pending(), 100)
+        self.assertTrue(self.queue.flush(timeout=5))
+        self.assertEqual(self.queue.commits, 1)
+        self.assertEqual(self.rows(), list(range(100)))
+
+    def test_flush_makes_writes_visible(self):
+        self.queue = WriteBehindQueue(self.path, interval=60.0)
+        self.queue.submit(INSERT, (1,))
+        self.queue.submit_many([(INSERT, (2,)), (INSERT, (3,))])
+        self.assertEqual(self.rows(), [])  # przed upływem interwału nic nie jest zatwierdzone
+        self.assertTrue(self.queue.flush(timeout=5))
+        self.assertEqual(self.rows(), [1, 2, 3])
+        self.assertEqual(self.queue.pending(), 0)
+
+    def test_data_error_skips_only_that_statement(self):
+        self.queue = WriteBehindQueue(self.path, interval=60.0)
+        for n in (1, 1, 2):
+            self.queue.submit(INSERT, (n,))
+        self.assertTrue(self.queue.flush(timeout=5))
+        self.assertEqual(self.rows(), [1, 2])
+
+    def test_data_error_rolls_back_whole_group(self):
+        self.queue = WriteBehindQueue(self.path, interval=60.0)
+        self.queue.submit(INSERT, (1,))
+        self.queue.submit_many([(INSERT, (2,)), (INSERT, (1,)), (INSERT, (3,))])
+        self.queue.submit_many([(INSERT, (4,)), (INSERT, (5,))])
+        self.assertTrue(self.queue.flush(timeout=5))
+        self.assertEqual(self.rows(), [1, 4, 5])
+        self.assertEqual(self.queue.pending(), 0)
+
+    def test_locked_database_keeps_batch_queued(self):
+        self.queue = WriteBehindQueue(self.path, interval=60.0, retry_delay=0.05)
+        blocker = sqlite3.connect(self.path, isolation_level=None)
+        blocker.execute("BEGIN EXCLUSIVE")
+        try:
+            for n in range(3):
+                self.queue.submit(INSERT, (n,))
+            self.assertFalse(self.queue.flush(timeout=0.5))
+            self.assertEqual(self.queue.pending(), 3)
+        finally:
+            blocker.execute("ROLLBACK")
+            blocker.close()
+        self.assertTrue(self.queue.flush(timeout=10))
+        self.assertEqual(self.rows(), [0, 1, 2])
+
+    def test_unclean_stop_loses_only_last_interval(self):
+        self.crash("""
+            for n in range(10):
+                queue.submit("INSERT INTO items (n) VALUES (?)", (n,))
+            time.sleep(1.0)  # > interval: pierwsza paczka zatwierdzona
+            for n in range(10, 15):
+                queue.submit("INSERT INTO items (n) VALUES (?)", (n,))
+        """, interval=0.3)
+        rows = self.rows()
+        self.assertEqual(rows[:10], list(range(10)))
+        self.assertLessEqual(len(rows), 15)
+
+    def test_unclean_stop_loses_less_than_one_batch(self):
+        self.crash("""
+            for n in range(25):
+                queue.submit("INSERT INTO items (n) VALUES (?)", (n,))
+            time.sleep(1.0)
+        """, max_batch=10)
+        rows = self.rows()
+        self.assertEqual(rows, list(range(len(rows))))  # bez dziur – przepada tylko koniec
+        self.assertLess(25 - len(rows), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,15 +3,18 @@ from PyQt6.QtWidgets import (
     QLabel, QSpinBox, QPushButton
 )
 from PyQt6.QtCore import QDate
-from ai.emotion_analyzer import EmotionAnalyzer
 
 class AdvancedMoodDialog(QDialog):
-    """Rozszerzony dialog do zapisywania nastroju z obsługą energy/focus i placeholdera analizy emocji."""
+    """Rozszerzony dialog do zapisywania nastroju z obsługą energy/focus i analizy emocji."""
 
-    def __init__(self, db_manager, parent=None):
+    def __init__(self, db_manager, parent=None, emotion_fusion=None):
+        """
+        emotion_fusion: EmotionFusion zasilany w tle przez EmotionStream – dialog tylko
+        odczytuje gotowy stan, bez przechwytywania i inferencji po kliknięciu.
+        """
         super().__init__(parent)
         self.db_manager = db_manager
-        self.emotion_analyzer = EmotionAnalyzer()
+        self.emotion_fusion = emotion_fusion
 
         self.setWindowTitle("Zapisz nastrój (Extended)")
         self.init_ui()
@@ -47,10 +50,15 @@ class AdvancedMoodDialog(QDialog):
 
         layout.addLayout(form_layout)
 
-        # Sekcja analizy audio/video (placeholder)
-        analyze_btn = QPushButton("Zrób szybką analizę wideo/audio (PLACEHOLDER)")
+        # Sekcja analizy audio/video
+        analyze_btn = QPushButton("Użyj analizy wideo/audio")
         analyze_btn.clicked.connect(self.do_emotion_analysis)
+        analyze_btn.setEnabled(self.emotion_fusion is not None)
         layout.addWidget(analyze_btn)
+        self.analysis_label = QLabel(
+            "" if self.emotion_fusion is not None else "Analiza emocji wyłączona."
+        )
+        layout.addWidget(self.analysis_label)
 
         # OK/Cancel
         btn_box = QDialogButtonBox(
@@ -63,11 +71,19 @@ class AdvancedMoodDialog(QDialog):
         self.setLayout(layout)
 
     def do_emotion_analysis(self):
-        # Tutaj placeholder; w realnej aplikacji – przechwycenie klatki/kilka sekund audio,
-        # wywołanie self.emotion_analyzer.analyze_audio(...) i interpretacja wyniku.
-        # Możesz np. ustawić mood_combo na bazie wyniku:
-        emotion_result = self.emotion_analyzer.analyze_audio(None)
-        self.mood_combo.setCurrentText(emotion_result)  # np. "Neutral", "Angry", "Happy"
+        """Ustawia nastrój, energię i skupienie z bieżącego, wygładzonego stanu analizy."""
+        state = self.emotion_fusion.state() if self.emotion_fusion is not None else None
+        if state is None:
+            self.analysis_label.setText("Brak świeżych odczytów z kamery/mikrofonu.")
+            return
+
+        self.mood_combo.setCurrentText(state["mood"])
+        self.energy_spin.setValue(state["energy_level"])
+        self.focus_spin.setValue(state["focus_level"])
+        sources = ", ".join(f"{source}: {label}" for source, label in state["sources"].items())
+        self.analysis_label.setText(
+            f"Pewność {state['confidence']:.0%} z {state['samples']} odczytów ({sources})"
+        )
 
     def get_mood_data(self):
         return {
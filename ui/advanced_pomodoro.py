@@ -1,19 +1,35 @@
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QSpinBox, QMessageBox
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSpinBox, QMessageBox
 )
-from PyQt6.QtCore import Qt
+import time
+from PyQt6.QtCore import Qt, QTimer
 from ai.pomodoro_ai import PomodoroAI
+from core.pomodoro_timer import PomodoroTimer
+from ui.task_picker import TaskPicker
 
 class AdvancedPomodoroWidget(QWidget):
-    """Widget do inteligentnego Pomodoro – wybór zadania, start sesji."""
+    """Widget do inteligentnego Pomodoro – wybór zadania, start sesji, odliczanie."""
 
-    def __init__(self, db_manager):
+    CHECKPOINT_INTERVAL = 30  # co ile sekund odliczania zapisujemy stan sesji
+
+    def __init__(self, db_manager, scheduler=None):
         super().__init__()
         self.db_manager = db_manager
+        self.scheduler = scheduler
         self.pomodoro_ai = PomodoroAI()
         self.current_session_id = None
 
+        # Silnik odliczania + jednorazowy, "gruby" timer Qt budzony tylko
+        # wtedy, gdy zmienia się wyświetlana wartość.
+        self.timer = PomodoroTimer()
+        self.tick_timer = QTimer(self)
+        self.tick_timer.setSingleShot(True)
+        self.tick_timer.setTimerType(Qt.TimerType.CoarseTimer)
+        self.tick_timer.timeout.connect(self.on_tick)
+        self._last_checkpoint = 0.0
+
         self.init_ui()
+        self.restore_active_session()
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -21,22 +37,33 @@ class AdvancedPomodoroWidget(QWidget):
         # Wybór zadania z listy
         task_layout = QHBoxLayout()
         task_layout.addWidget(QLabel("Zadanie:"))
-        self.task_combo = QComboBox()
-        self.refresh_task_list()
-        task_layout.addWidget(self.task_combo)
+        self.task_picker = TaskPicker(self.db_manager)
+        task_layout.addWidget(self.task_picker)
         layout.addLayout(task_layout)
 
         # Rekomendowana długość
         self.recommended_label = QLabel("Rekomendowana długość: ?? min")
         layout.addWidget(self.recommended_label)
 
-        # Start/Stop
+        # Odliczanie
+        self.phase_label = QLabel("Brak aktywnej sesji")
+        layout.addWidget(self.phase_label)
+        self.time_label = QLabel("00:00")
+        self.time_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.time_label.setStyleSheet("font-size: 28px; font-weight: bold;")
+        layout.addWidget(self.time_label)
+
+        # Start/Pauza/Stop
         btn_layout = QHBoxLayout()
         self.start_btn = QPushButton("Rozpocznij sesję")
         self.start_btn.clicked.connect(self.start_pomodoro)
+        self.pause_btn = QPushButton("Pauza")
+        self.pause_btn.clicked.connect(self.toggle_pause)
+        self.pause_btn.setEnabled(False)
         self.end_btn = QPushButton("Zakończ sesję")
         self.end_btn.clicked.connect(self.end_pomodoro)
         btn_layout.addWidget(self.start_btn)
+        btn_layout.addWidget(self.pause_btn)
         btn_layout.addWidget(self.end_btn)
         layout.addLayout(btn_layout)
 
@@ -44,11 +71,17 @@ class AdvancedPomodoroWidget(QWidget):
         self.setMinimumHeight(200)
 
     def refresh_task_list(self):
-        self.task_combo.clear()
-        tasks = self.db_manager.get_tasks()
-        for t in tasks:
-            # W combo wyświetlamy np. "ID - Tytuł"
-            self.task_combo.addItem(f"{t['id']} - {t['title']}")
+        # Lista ładuje się leniwie – wystarczy oznaczyć ją jako nieaktualną
+        self.task_picker.invalidate()
+        self.suggest_task()
+
+    def suggest_task(self):
+        """Domyślny wybór zadania – najlepsza pozycja z harmonogramu (TaskScheduler)."""
+        if self.scheduler is None or self.current_session_id:
+            return
+        task = self.scheduler.best()
+        if task:
+            self.task_picker.select_task(task["id"], task["title"])
 
     def get_current_mood_entry(self):
         """
@@ -57,9 +90,8 @@ class AdvancedPomodoroWidget(QWidget):
         Tu – placeholder.
         """
         # Weźmy ostatni mood z bazy (jeśli istnieje)
-        moods = self.db_manager.get_moods()
-        if moods:
-            m = moods[0]  # Najnowszy
+        m = self.db_manager.get_latest_mood()
+        if m:
             return {
                 "mood": m["mood"],
                 "energy_level": m.get("energy_level", 5),
@@ -75,20 +107,15 @@ class AdvancedPomodoroWidget(QWidget):
             return
 
         # Odczytaj ID zadania
-        selected_text = self.task_combo.currentText()
-        if not selected_text:
+        task_id = self.task_picker.selected_task_id()
+        if task_id is None:
             QMessageBox.warning(self, "Błąd", "Brak wybranego zadania.")
             return
 
-        task_id = selected_text.split(" - ")[0]
-
         # AI - ustalenie rekomendowanej długości
         mood_entry = self.get_current_mood_entry()
-        # Wczytaj poprzednie pomodoro sesje
-        # (Przykład – pobierasz z bazy i ewentualnie filtrujesz po zadaniu)
-        # Tu uproszczone: bierzemy wszystko
-        # W realu -> implementuj w DB
-        last_sessions = []
+        # Ostatnie zakończone sesje jako korekta rekomendacji
+        last_sessions = self.db_manager.get_recent_sessions(limit=3)
 
         recommended_minutes = self.pomodoro_ai.recommend_session_length(mood_entry, last_sessions)
         self.recommended_label.setText(f"Rekomendowana długość: {recommended_minutes} min")
@@ -97,20 +124,123 @@ class AdvancedPomodoroWidget(QWidget):
         session_id = self.db_manager.add_pomodoro_session(task_id, recommended_minutes)
         if session_id:
             self.current_session_id = session_id
-            QMessageBox.information(self, "Pomodoro", f"Rozpoczęto sesję na {recommended_minutes} min.")
+            self.timer.start(recommended_minutes * 60)
+            self.checkpoint()
+            self.update_display()
+            self.schedule_tick()
         else:
             QMessageBox.critical(self, "Błąd", "Nie udało się rozpocząć sesji.")
 
     def end_pomodoro(self):
-        """Kończy bieżącą sesję."""
+        """Kończy bieżącą sesję (albo przerwę)."""
+        if self.timer.phase == PomodoroTimer.PHASE_BREAK:
+            self.timer.stop()
+            self.update_display()
+            return
+
         if not self.current_session_id:
             QMessageBox.warning(self, "Uwaga", "Nie ma aktywnej sesji do zakończenia.")
             return
 
-        success = self.db_manager.end_pomodoro_session(self.current_session_id)
-        if success:
-            QMessageBox.information(self, "Pomodoro", "Sesja zakończona.")
+        self.finish_work_phase()
+
+    def toggle_pause(self):
+        if not self.timer.is_active:
+            return
+        if self.timer.is_paused:
+            self.timer.resume()
         else:
+            self.timer.pause()
+        self.checkpoint()
+        self.update_display()
+        self.schedule_tick()
+
+    # ----- Odliczanie -----
+    def schedule_tick(self):
+        """Budzi pętlę zdarzeń dopiero przy następnej zmianie wyświetlanej sekundy."""
+        delay = self.timer.seconds_until_next_tick()
+        if delay is None:
+            self.tick_timer.stop()
+            return
+        # mały zapas, żeby po wybudzeniu wartość na pewno była już nowa
+        self.tick_timer.start(int(delay * 1000) + 5)
+
+    def on_tick(self):
+        if self.timer.is_finished():
+            self.on_phase_finished()
+            return
+
+        self.update_display()
+        if time.monotonic() - self._last_checkpoint >= self.CHECKPOINT_INTERVAL:
+            self.checkpoint()
+        self.schedule_tick()
+
+    def on_phase_finished(self):
+        if self.timer.phase == PomodoroTimer.PHASE_WORK:
+            self.finish_work_phase()
+            break_seconds = self.timer.start_break()
+            self.update_display()
+            self.schedule_tick()
+            QMessageBox.information(
+                self, "Pomodoro", f"Sesja zakończona. Czas na przerwę ({break_seconds // 60} min)."
+            )
+        else:
+            self.timer.stop()
+            self.update_display()
+            QMessageBox.information(self, "Pomodoro", "Przerwa zakończona.")
+
+    def finish_work_phase(self):
+        """Zatrzymuje fazę pracy i zapisuje faktycznie odliczony czas."""
+        planned = self.timer.duration
+        elapsed = self.timer.stop()
+        success = self.db_manager.end_pomodoro_session(
+            self.current_session_id,
+            actual_minutes=int(elapsed // 60),
+            completed=elapsed >= planned,
+        )
+        if not success:
             QMessageBox.critical(self, "Błąd", "Nie udało się zakończyć sesji.")
 
         self.current_session_id = None
+        self.tick_timer.stop()
+        self.update_display()
+
+    def checkpoint(self):
+        """Zapis stanu sesji w bazie – po awarii sesja wznowi się od tego miejsca."""
+        self._last_checkpoint = time.monotonic()
+        if self.current_session_id and self.timer.phase == PomodoroTimer.PHASE_WORK:
+            self.db_manager.checkpoint_pomodoro_session(
+                self.current_session_id, self.timer.elapsed(), self.timer.is_paused
+            )
+
+    def restore_active_session(self):
+        """
+        Wznawia sesję przerwaną przez awarię/zamknięcie aplikacji.
+        Sesja wraca jako wstrzymana – czas, gdy aplikacja nie działała, nie jest liczony.
+        """
+        session = self.db_manager.get_active_pomodoro_session()
+        if not session or not session.get("planned_duration"):
+            return
+
+        self.current_session_id = session["id"]
+        self.timer.start(
+            session["planned_duration"] * 60,
+            elapsed=session.get("elapsed_seconds") or 0,
+            paused=True,
+        )
+        self.recommended_label.setText(f"Rekomendowana długość: {session['planned_duration']} min")
+        self.update_display()
+
+    def update_display(self):
+        seconds = self.timer.display_seconds()
+        self.time_label.setText(f"{seconds // 60:02d}:{seconds % 60:02d}")
+
+        if not self.timer.is_active:
+            self.phase_label.setText("Brak aktywnej sesji")
+        elif self.timer.phase == PomodoroTimer.PHASE_BREAK:
+            self.phase_label.setText("Przerwa" + (" (wstrzymana)" if self.timer.is_paused else ""))
+        else:
+            self.phase_label.setText("Praca" + (" (wstrzymana)" if self.timer.is_paused else ""))
+
+        self.pause_btn.setEnabled(self.timer.is_active)
+        self.pause_btn.setText("Wznów" if self.timer.is_paused else "Pauza")
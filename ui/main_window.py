@@ -3,17 +3,24 @@ from PyQt6.QtWidgets import (
     QPushButton, QLineEdit, QTextEdit, QComboBox, QLabel,
     QTableWidget, QTableWidgetItem, QCalendarWidget, QMessageBox,
     QDialog, QFormLayout, QDialogButtonBox, QScrollArea, QTreeWidget,
-    QTreeWidgetItem
+    QTreeWidgetItem, QDockWidget, QDateEdit
 )
 from PyQt6.QtCore import Qt, QDate
-from data.database import DatabaseManager
+from PyQt6.QtGui import QTextCharFormat, QFont
+from data.database import DatabaseManager, validate_date
+from data.recurrence import FREQ_DAILY, FREQ_WEEKLY, FREQ_MONTHLY, WORKDAYS, STATUS_SKIPPED, same_rule
+from core.task_scheduler import TaskScheduler
+from ui.advanced_pomodoro import AdvancedPomodoroWidget
+from ui.advanced_mood import AdvancedMoodDialog
 
 class MainWindow(QMainWindow):
     """Główne okno aplikacji."""
 
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, emotion_fusion=None):
         super().__init__()
         self.db_manager = db_manager
+        self.emotion_fusion = emotion_fusion
+        self.scheduler = TaskScheduler(db_manager)
 
         self.setWindowTitle("ADHD Support App (PyQt6) – MVP")
         self.setMinimumSize(800, 600)
@@ -85,7 +92,9 @@ class MainWindow(QMainWindow):
         self.calendar = QCalendarWidget()
         self.calendar.setGridVisible(True)
         self.calendar.selectionChanged.connect(self.on_date_changed)
+        self.calendar.currentPageChanged.connect(self.highlight_task_dates)
         self.calendar_layout.addWidget(self.calendar)
+        self.highlighted_dates = []
 
         # Wyświetlanie zadań i nastroju dla wybranej daty
         self.date_info_label = QLabel("Wybierz datę w kalendarzu")
@@ -95,11 +104,33 @@ class MainWindow(QMainWindow):
         self.date_tasks.setHeaderLabels(["Zadanie", "Priorytet", "Status"])
         self.calendar_layout.addWidget(self.date_tasks)
 
+        # Oznaczanie pojedynczego wystąpienia (zadania powtarzalne)
+        occurrence_btn_layout = QHBoxLayout()
+        self.done_occurrence_btn = QPushButton("Wykonane")
+        self.done_occurrence_btn.clicked.connect(lambda: self.mark_occurrence("Done"))
+        self.skip_occurrence_btn = QPushButton("Pomiń wystąpienie")
+        self.skip_occurrence_btn.clicked.connect(lambda: self.mark_occurrence(STATUS_SKIPPED))
+        occurrence_btn_layout.addWidget(self.done_occurrence_btn)
+        occurrence_btn_layout.addWidget(self.skip_occurrence_btn)
+        self.calendar_layout.addLayout(occurrence_btn_layout)
+
         self.date_mood_label = QLabel("Nastrój: Brak wpisu")
         self.calendar_layout.addWidget(self.date_mood_label)
 
         self.tabs.addTab(self.calendar_tab, "Kalendarz")
 
+        # --- Dock z Pomodoro ---
+        self.pomodoro_widget = AdvancedPomodoroWidget(self.db_manager, self.scheduler)
+        self.pomodoro_dock = QDockWidget("Pomodoro", self)
+        self.pomodoro_dock.setWidget(self.pomodoro_widget)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.pomodoro_dock)
+
+    def closeEvent(self, event):
+        """Przed zamknięciem zapisz stan trwającej sesji pomodoro i zaległe zapisy."""
+        self.pomodoro_widget.checkpoint()
+        self.db_manager.flush()
+        super().closeEvent(event)
+
     # ------------------- TASKS -------------------
     def refresh_task_list(self):
         """Odśwież listę zadań w tabeli."""
@@ -113,6 +144,9 @@ class MainWindow(QMainWindow):
             self.task_table.setItem(row, 3, QTableWidgetItem(task["status"]))
             self.task_table.setItem(row, 4, QTableWidgetItem(task.get("due_date", "")))
 
+        self.pomodoro_widget.refresh_task_list()
+        self.highlight_task_dates()
+
     def show_add_task_dialog(self):
         dialog = TaskDialog(self)
         if dialog.exec():
@@ -122,8 +156,10 @@ class MainWindow(QMainWindow):
                 data["description"],
                 data["priority"],
                 data["status"],
-                data["due_date"]
+                data["due_date"],
+                recurrence=data["recurrence"]
             )
+            self.scheduler.refresh()
             self.refresh_task_list()
 
     def show_edit_task_dialog(self):
@@ -138,7 +174,8 @@ class MainWindow(QMainWindow):
             "title": self.task_table.item(row, 1).text(),
             "priority": self.task_table.item(row, 2).text(),
             "status": self.task_table.item(row, 3).text(),
-            "due_date": self.task_table.item(row, 4).text()
+            "due_date": self.task_table.item(row, 4).text(),
+            "recurrence": self.db_manager.get_task_recurrence(task_id)
         }
 
         dialog = TaskDialog(self, current_task)
@@ -152,6 +189,10 @@ class MainWindow(QMainWindow):
                 data["status"],
                 data["due_date"]
             )
+            # Zapis reguły tylko przy faktycznej zmianie – edycja samego zadania jej nie rusza
+            if not same_rule(data["recurrence"], current_task["recurrence"]):
+                self.db_manager.set_task_recurrence(task_id, data["recurrence"])
+            self.scheduler.task_changed(task_id)
             self.refresh_task_list()
 
     def delete_task(self):
@@ -169,6 +210,7 @@ class MainWindow(QMainWindow):
         )
         if confirm == QMessageBox.StandardButton.Yes:
             self.db_manager.delete_task(task_id)
+            self.scheduler.task_removed(task_id)
             self.refresh_task_list()
 
     # ------------------- MOOD -------------------
@@ -183,11 +225,21 @@ class MainWindow(QMainWindow):
             self.mood_table.setItem(row, 2, QTableWidgetItem(mood.get("notes", "")))
 
     def show_add_mood_dialog(self):
-        dialog = MoodDialog(self)
+        if self.emotion_fusion is not None:
+            # Z analizą emocji w tle – dialog z energią/skupieniem podpowiadanymi z kamery/mikrofonu
+            dialog = AdvancedMoodDialog(self.db_manager, self, self.emotion_fusion)
+        else:
+            dialog = MoodDialog(self)
         if dialog.exec():
             data = dialog.get_mood_data()
-            self.db_manager.add_mood(data["date"], data["mood"], data["notes"])
+            self.db_manager.add_mood(
+                data["date"], data["mood"], data["notes"],
+                data.get("energy_level", 5), data.get("focus_level", 5)
+            )
             self.refresh_mood_list()
+            # Nowa energia/skupienie zmieniają kolejność podpowiedzi
+            self.scheduler.set_mood(self.db_manager.get_latest_mood())
+            self.pomodoro_widget.suggest_task()
 
     # ------------------- CALENDAR -------------------
     def on_date_changed(self):
@@ -195,11 +247,13 @@ class MainWindow(QMainWindow):
         selected_date = self.calendar.selectedDate().toString("yyyy-MM-dd")
         self.date_info_label.setText(f"Wybrana data: {selected_date}")
 
-        # Zadania
+        # Zadania (razem z wystąpieniami zadań powtarzalnych)
         tasks = self.db_manager.get_task_by_date(selected_date)
         self.date_tasks.clear()
         for t in tasks:
-            item = QTreeWidgetItem([t["title"], t["priority"], t["status"]])
+            title = f"{t['title']} ↻" if t["recurring"] else t["title"]
+            item = QTreeWidgetItem([title, t["priority"], t["status"]])
+            item.setData(0, Qt.ItemDataRole.UserRole, t)
             self.date_tasks.addTopLevelItem(item)
 
         # Nastrój
@@ -210,11 +264,56 @@ class MainWindow(QMainWindow):
         else:
             self.date_mood_label.setText("Nastrój: Brak wpisu")
 
+    def highlight_task_dates(self, year=None, month=None):
+        """Pogrubia w widoku miesiąca dni z zadaniami – jedno zapytanie na cały miesiąc."""
+        if year is None:
+            year, month = self.calendar.yearShown(), self.calendar.monthShown()
+        first = QDate(year, month, 1)
+        last = first.addDays(first.daysInMonth() - 1)
+
+        for day in self.highlighted_dates:
+            self.calendar.setDateTextFormat(day, QTextCharFormat())
+
+        bold = QTextCharFormat()
+        bold.setFontWeight(QFont.Weight.Bold)
+        tasks = self.db_manager.get_tasks_between(first.toString("yyyy-MM-dd"), last.toString("yyyy-MM-dd"))
+        self.highlighted_dates = [
+            QDate.fromString(day, "yyyy-MM-dd")
+            for day in {t["due_date"] for t in tasks if t["status"] != "Done"}
+        ]
+        for day in self.highlighted_dates:
+            self.calendar.setDateTextFormat(day, bold)
+
+    def mark_occurrence(self, status):
+        """Oznacza wybrane w kalendarzu wystąpienie zadania powtarzalnego."""
+        item = self.date_tasks.currentItem()
+        if item is None:
+            QMessageBox.warning(self, "Uwaga", "Wybierz zadanie z listy.")
+            return
+        task = item.data(0, Qt.ItemDataRole.UserRole)
+        if not task["recurring"]:
+            QMessageBox.information(self, "Informacja", "To zadanie nie jest powtarzalne – zmień jego status w zakładce Zadania.")
+            return
+
+        self.db_manager.set_occurrence_override(task["id"], task["occurrence_date"], status=status)
+        self.scheduler.task_changed(task["id"])
+        self.on_date_changed()
+        self.highlight_task_dates()
+        self.pomodoro_widget.suggest_task()
+
 # ------------------- DIALOGI -------------------
 
 class TaskDialog(QDialog):
     """Dialog do tworzenia/edycji zadania."""
 
+    RECURRENCE_OPTIONS = [
+        ("Brak", None),
+        ("Codziennie", {"freq": FREQ_DAILY, "weekdays": 0}),
+        ("W dni robocze", {"freq": FREQ_WEEKLY, "weekdays": WORKDAYS}),
+        ("Co tydzień", {"freq": FREQ_WEEKLY, "weekdays": 0}),
+        ("Co miesiąc", {"freq": FREQ_MONTHLY, "weekdays": 0}),
+    ]
+
     def __init__(self, parent=None, task=None):
         super().__init__(parent)
         self.setWindowTitle("Nowe zadanie" if not task else "Edytuj zadanie")
@@ -240,9 +339,17 @@ class TaskDialog(QDialog):
         self.status_combo.addItems(["To Do", "In Progress", "Done"])
         form_layout.addRow("Status:", self.status_combo)
 
-        self.due_date_edit = QLineEdit()  # Prosta wersja, można np. wprowadzić QDateEdit
+        # Pole tekstowe, bo termin może być pusty; format sprawdza accept()
+        self.due_date_edit = QLineEdit()
+        self.due_date_edit.setPlaceholderText("bez terminu")
         form_layout.addRow("Termin (YYYY-MM-DD):", self.due_date_edit)
 
+        # Termin jest pierwszym wystąpieniem zadania powtarzalnego
+        self.recurrence_combo = QComboBox()
+        for label, rule in self.RECURRENCE_OPTIONS:
+            self.recurrence_combo.addItem(label, rule)
+        form_layout.addRow("Powtarzanie:", self.recurrence_combo)
+
         layout.addLayout(form_layout)
 
         btn_box = QDialogButtonBox(
@@ -260,6 +367,26 @@ class TaskDialog(QDialog):
             self.priority_combo.setCurrentText(self.task["priority"])
             self.status_combo.setCurrentText(self.task["status"])
             self.due_date_edit.setText(self.task.get("due_date", ""))
+            recurrence = self.task.get("recurrence")
+            if recurrence:
+                for index, (_label, rule) in enumerate(self.RECURRENCE_OPTIONS):
+                    if rule and rule["freq"] == recurrence["freq"] and rule["weekdays"] == recurrence["weekdays"] \
+                            and recurrence["interval"] == 1 and not recurrence["until"]:
+                        self.recurrence_combo.setCurrentIndex(index)
+                        break
+                else:
+                    # Reguła spoza listy (np. z API) – zostaje bez zmian, dopóki użytkownik jej nie zmieni
+                    self.recurrence_combo.addItem("Własna reguła", recurrence)
+                    self.recurrence_combo.setCurrentIndex(self.recurrence_combo.count() - 1)
+
+    def accept(self):
+        try:
+            validate_date(self.due_date_edit.text(), allow_empty=True)
+        except ValueError as e:
+            QMessageBox.warning(self, "Uwaga", str(e))
+            self.due_date_edit.setFocus()
+            return
+        super().accept()
 
     def get_task_data(self):
         return {
@@ -268,6 +395,7 @@ class TaskDialog(QDialog):
             "priority": self.priority_combo.currentText(),
             "status": self.status_combo.currentText(),
             "due_date": self.due_date_edit.text(),
+            "recurrence": self.recurrence_combo.currentData(),
         }
 
 
@@ -284,9 +412,10 @@ class MoodDialog(QDialog):
         layout = QVBoxLayout()
         form_layout = QFormLayout()
 
-        self.date_edit = QLineEdit()
-        self.date_edit.setText(QDate.currentDate().toString("yyyy-MM-dd"))
-        form_layout.addRow("Data (YYYY-MM-DD):", self.date_edit)
+        self.date_edit = QDateEdit(QDate.currentDate())
+        self.date_edit.setCalendarPopup(True)
+        self.date_edit.setDisplayFormat("yyyy-MM-dd")
+        form_layout.addRow("Data:", self.date_edit)
 
         self.mood_combo = QComboBox()
         self.mood_combo.addItems(["Dobry", "Neutralny", "Zły"])
@@ -308,7 +437,7 @@ class MoodDialog(QDialog):
 
     def get_mood_data(self):
         return {
-            "date": self.date_edit.text(),
+            "date": self.date_edit.date().toString("yyyy-MM-dd"),
             "mood": self.mood_combo.currentText(),
             "notes": self.notes_edit.toPlainText(),
         }
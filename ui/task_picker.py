@@ -0,0 +1,93 @@
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLineEdit, QComboBox
+from PyQt6.QtCore import QTimer, pyqtSignal
+
+
+class _LazyComboBox(QComboBox):
+    """QComboBox, który prosi o dane dopiero przy pierwszym rozwinięciu listy."""
+
+    aboutToShowPopup = pyqtSignal()
+
+    def showPopup(self):
+        self.aboutToShowPopup.emit()
+        super().showPopup()
+
+
+class TaskPicker(QWidget):
+    """
+    Wybór zadania z filtrowaniem po wpisanym tekście.
+
+    Lista nie jest ładowana przy tworzeniu widgetu – dopiero przy rozwinięciu
+    albo wpisaniu filtra, i zawsze tylko `limit` pozycji (id, tytuł).
+    ID zadania trzymamy w danych elementu, a nie w etykiecie.
+    """
+
+    FILTER_DELAY_MS = 250
+
+    def __init__(self, db_manager, limit=50, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.limit = limit
+        self._loaded = False
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Filtruj zadania...")
+        self.filter_edit.textEdited.connect(self._on_filter_edited)
+        layout.addWidget(self.filter_edit)
+
+        self.combo = _LazyComboBox()
+        self.combo.setPlaceholderText("Wybierz zadanie")
+        self.combo.aboutToShowPopup.connect(self.ensure_loaded)
+        layout.addWidget(self.combo)
+
+        self.setLayout(layout)
+
+        # Opóźnienie, żeby nie odpytywać bazy po każdym znaku
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(self.FILTER_DELAY_MS)
+        self._filter_timer.timeout.connect(self.reload)
+
+    def _on_filter_edited(self, _text):
+        self._filter_timer.start()
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            self.reload()
+
+    def reload(self):
+        """Pobiera z bazy pasujące zadania, zachowując bieżący wybór, jeśli to możliwe."""
+        selected_id = self.combo.currentData()
+
+        tasks = self.db_manager.get_task_titles(
+            limit=self.limit, search=self.filter_edit.text().strip()
+        )
+        self.combo.clear()
+        for t in tasks:
+            self.combo.addItem(t["title"], t["id"])
+        self._loaded = True
+
+        if selected_id is not None:
+            index = self.combo.findData(selected_id)
+            if index >= 0:
+                self.combo.setCurrentIndex(index)
+
+    def invalidate(self):
+        """Zadania się zmieniły – przeładuj przy następnym użyciu."""
+        self._loaded = False
+        self.combo.clear()
+
+    def selected_task_id(self):
+        if self.combo.currentIndex() < 0:
+            self.ensure_loaded()
+        return self.combo.currentData()
+
+    def select_task(self, task_id, title):
+        """Ustawia wybór bez ładowania całej listy (np. podpowiedź domyślnego zadania)."""
+        index = self.combo.findData(task_id)
+        if index < 0:
+            self.combo.addItem(title, task_id)
+            index = self.combo.count() - 1
+        self.combo.setCurrentIndex(index)